@@ -3,23 +3,16 @@ Script principal para executar todo o fluxo do sistema de agentes de IA.
 """
 
 import logging
-import os
-import sys
-from pathlib import Path
 import time
-import json
 import argparse
+import functools
+import ijson
 
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent
-sys.path.append(str(project_root))
-
-from src.agent_orchestrator import AgentOrchestrator
-from src.data_processor import DataProcessor
-from src.insight_generator import InsightGenerator
-from src.content_generator import ContentGenerator
-from src.models.ollama_client import OllamaClient
+# Os módulos de cada etapa são importados apenas quando a etapa é executada
 from src.config.config import OLLAMA_CONFIG
+from src.utils.fs import ensure_dir
+from src.utils.http import close_session
+from src.utils.json_io import STREAM_READ_SIZE
 
 # Configurar logging
 logging.basicConfig(
@@ -32,11 +25,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
 def check_ollama_connection():
-    """Verifica a conexão com o Ollama."""
+    """Verifica a conexão com o Ollama (o resultado é reaproveitado durante todo o processo)."""
     try:
+        from src.models.ollama_client import OllamaClient
+        
         client = OllamaClient(OLLAMA_CONFIG)
         models = client.list_models()
+        client.close()
         
         if models:
             logger.info(f"Conexão com Ollama estabelecida. Modelos disponíveis: {models}")
@@ -52,41 +49,44 @@ def run_data_collection(args):
     """Executa a coleta de dados."""
     logger.info("Iniciando coleta de dados...")
     
-    orchestrator = AgentOrchestrator()
-    
-    if args.agent:
-        # Executar apenas um agente específico
-        if args.agent not in orchestrator.agents:
-            logger.error(f"Agente {args.agent} não encontrado")
-            return False
-        
-        result = orchestrator.run_agent(args.agent)
-        success = result.get("success", False)
-        
-        if success:
-            logger.info(f"Coleta de dados do agente {args.agent} concluída com sucesso")
-        else:
-            logger.error(f"Falha na coleta de dados do agente {args.agent}: {result.get('message', '')}")
-        
-        return success
-    else:
-        # Executar todos os agentes
-        results = orchestrator.run_all_agents()
-        
-        # Verificar se pelo menos um agente foi bem-sucedido
-        success = any(result.get("success", False) for result in results.values())
-        
-        if success:
-            logger.info("Coleta de dados concluída com sucesso")
+    from src.agent_orchestrator import AgentOrchestrator
+    
+    with AgentOrchestrator() as orchestrator:
+        if args.agent:
+            # Executar apenas um agente específico
+            if args.agent not in orchestrator.agents:
+                logger.error(f"Agente {args.agent} não encontrado")
+                return False
+            
+            result = orchestrator.run_agent(args.agent)
+            success = result.get("success", False)
+            
+            if success:
+                logger.info(f"Coleta de dados do agente {args.agent} concluída com sucesso")
+            else:
+                logger.error(f"Falha na coleta de dados do agente {args.agent}: {result.get('message', '')}")
+            
+            return success
         else:
-            logger.error("Falha na coleta de dados de todos os agentes")
-        
-        return success
+            # Executar todos os agentes
+            results = orchestrator.run_all_agents()
+            
+            # Verificar se pelo menos um agente foi bem-sucedido
+            success = any(result.get("success", False) for result in results.values())
+            
+            if success:
+                logger.info("Coleta de dados concluída com sucesso")
+            else:
+                logger.error("Falha na coleta de dados de todos os agentes")
+            
+            return success
 
 def run_data_processing():
     """Executa o processamento de dados."""
     logger.info("Iniciando processamento de dados...")
     
+    from src.data_processor import DataProcessor
+    
     processor = DataProcessor()
     processed_data = processor.process_all_data()
     
@@ -101,6 +101,8 @@ def run_insight_generation():
     """Executa a geração de insights."""
     logger.info("Iniciando geração de insights...")
     
+    from src.insight_generator import InsightGenerator
+    
     generator = InsightGenerator()
     insights = generator.generate_all_insights()
     
@@ -115,8 +117,10 @@ def run_content_generation(args):
     """Executa a geração de conteúdo."""
     logger.info("Iniciando geração de matérias...")
     
-    generator = ContentGenerator()
-    articles = generator.generate_all_articles(max_articles=args.max_articles)
+    from src.content_generator import ContentGenerator
+    
+    with ContentGenerator() as generator:
+        articles = generator.generate_all_articles(max_articles=args.max_articles)
     
     if articles:
         logger.info(f"Geração de {len(articles)} matérias concluída com sucesso")
@@ -158,12 +162,14 @@ def run_full_pipeline(args):
     
     # Exibir resultados
     try:
-        with open("data/processed/materias.json", 'r', encoding='utf-8') as f:
-            articles = json.load(f)
+        # Percorrer as matérias uma a uma, sem carregar o arquivo inteiro
+        logger.info("Matérias geradas:")
+        total = 0
+        with open("data/processed/materias.json", 'rb') as f:
+            for total, article in enumerate(ijson.items(f, "item", buf_size=STREAM_READ_SIZE), 1):
+                logger.info("%d. %s - %s", total, article.get('titulo', 'Sem título'), article.get('editoria', 'Sem editoria'))
         
-        logger.info(f"Foram geradas {len(articles)} matérias:")
-        for i, article in enumerate(articles, 1):
-            logger.info(f"{i}. {article.get('titulo', 'Sem título')} - {article.get('editoria', 'Sem editoria')}")
+        logger.info(f"Foram geradas {total} matérias")
     
     except Exception as e:
         logger.error(f"Erro ao exibir resultados: {e}")
@@ -186,22 +192,24 @@ def main():
     args = parser.parse_args()
     
     # Criar diretórios necessários
-    os.makedirs("data/raw", exist_ok=True)
-    os.makedirs("data/processed", exist_ok=True)
-    os.makedirs("data/processed/insights", exist_ok=True)
-    os.makedirs("data/processed/visualizations", exist_ok=True)
+    for directory in ("data/raw", "data/processed", "data/processed/insights", "data/processed/visualizations"):
+        ensure_dir(directory)
     
     # Executar etapa específica ou pipeline completo
-    if args.step == "collect":
-        run_data_collection(args)
-    elif args.step == "process":
-        run_data_processing()
-    elif args.step == "insights":
-        run_insight_generation()
-    elif args.step == "generate":
-        run_content_generation(args)
-    else:  # all
-        run_full_pipeline(args)
+    try:
+        if args.step == "collect":
+            run_data_collection(args)
+        elif args.step == "process":
+            run_data_processing()
+        elif args.step == "insights":
+            run_insight_generation()
+        elif args.step == "generate":
+            run_content_generation(args)
+        else:  # all
+            run_full_pipeline(args)
+    finally:
+        # Liberar as conexões HTTP compartilhadas
+        close_session()
 
 if __name__ == "__main__":
     main()
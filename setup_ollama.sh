@@ -21,9 +21,9 @@ else
     echo "Ollama instalado com sucesso."
 fi
 
-# Iniciar o serviço Ollama
+# Iniciar o serviço Ollama (aceitando requisições simultâneas, usadas na geração das matérias)
 echo "Iniciando o serviço Ollama..."
-ollama serve &
+OLLAMA_NUM_PARALLEL=${OLLAMA_NUM_PARALLEL:-4} ollama serve &
 
 # Aguardar o serviço iniciar
 sleep 5
@@ -38,5 +38,14 @@ if [ $? -ne 0 ]; then
 fi
 
 echo "Modelo Gemma baixado com sucesso."
+
+# Baixar o modelo de embeddings (usado para reaproveitar matérias de tópicos semelhantes)
+echo "Baixando o modelo de embeddings nomic-embed-text..."
+ollama pull nomic-embed-text
+
+if [ $? -ne 0 ]; then
+    echo "Aviso: não foi possível baixar o nomic-embed-text. A busca por matérias semelhantes ficará desativada."
+fi
+
 echo "Configuração concluída! O Ollama está em execução e o modelo Gemma está disponível."
 echo "Para usar o sistema de agentes de IA, execute: python main.py"
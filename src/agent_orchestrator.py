@@ -2,24 +2,17 @@
 Orquestrador para executar os agentes de coleta de dados.
 """
 
+import asyncio
 import logging
-import json
 from typing import List, Dict, Any
-import os
-from pathlib import Path
-import sys
-
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
 
 from src.agents.g1_agent import G1Agent
 from src.agents.twitter_agent import TwitterAgent
 from src.agents.instagram_agent import InstagramAgent
 from src.config.config import AGENT_CONFIG
+from src.utils.fs import ensure_dir
+from src.utils.json_io import save_json
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AgentOrchestrator:
@@ -34,10 +27,26 @@ class AgentOrchestrator:
         }
         
         # Criar diretório para dados processados
-        os.makedirs("data/processed", exist_ok=True)
+        ensure_dir("data/processed")
         
         logger.info(f"Orquestrador inicializado com {len(self.agents)} agentes")
     
+    def close(self) -> None:
+        """Libera os recursos de todos os agentes."""
+        for agent_name, agent in self.agents.items():
+            try:
+                agent.close()
+            except Exception as e:
+                logger.error(f"Erro ao encerrar o agente {agent_name}: {e}")
+    
+    def __enter__(self):
+        """Permite usar o objeto em um bloco with, liberando os recursos ao final."""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Libera os recursos ao sair do bloco with."""
+        self.close()
+    
     def run_agent(self, agent_name: str) -> Dict[str, Any]:
         """
         Executa um agente específico.
@@ -61,23 +70,50 @@ class AgentOrchestrator:
         logger.info(f"Executando agente: {agent_name}")
         return self.agents[agent_name].run()
     
-    def run_all_agents(self) -> Dict[str, Dict[str, Any]]:
+    async def run_all_agents_async(self) -> Dict[str, Dict[str, Any]]:
         """
-        Executa todos os agentes.
+        Executa todos os agentes concorrentemente.
         
         Returns:
             Resultados da execução de todos os agentes
         """
-        results = {}
+        agent_names = list(self.agents)
+        
+        for agent_name in agent_names:
+            logger.info(f"Executando agente: {agent_name}")
         
-        for agent_name in self.agents:
-            results[agent_name] = self.run_agent(agent_name)
+        outcomes = await asyncio.gather(
+            *(self.agents[agent_name].arun() for agent_name in agent_names),
+            return_exceptions=True
+        )
+        
+        results = {}
+        for agent_name, outcome in zip(agent_names, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Erro na execução do agente {agent_name}: {outcome}")
+                outcome = {
+                    "source": agent_name,
+                    "success": False,
+                    "message": f"Erro: {str(outcome)}",
+                    "data": [],
+                    "file_path": ""
+                }
+            results[agent_name] = outcome
         
         # Salvar resultados consolidados
         self._save_consolidated_results(results)
         
         return results
     
+    def run_all_agents(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Executa todos os agentes.
+        
+        Returns:
+            Resultados da execução de todos os agentes
+        """
+        return asyncio.run(self.run_all_agents_async())
+    
     def _save_consolidated_results(self, results: Dict[str, Dict[str, Any]]) -> str:
         """
         Salva os resultados consolidados de todos os agentes.
@@ -97,8 +133,7 @@ class AgentOrchestrator:
         file_path = "data/processed/all_data.json"
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(consolidated_data, f, ensure_ascii=False, indent=2)
+            save_json(consolidated_data, file_path)
             
             logger.info(f"Dados consolidados salvos em {file_path}")
             return file_path
@@ -107,9 +142,12 @@ class AgentOrchestrator:
             return ""
 
 if __name__ == "__main__":
+    # Configurar logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     logger.info("Iniciando orquestrador de agentes...")
-    orchestrator = AgentOrchestrator()
-    results = orchestrator.run_all_agents()
+    with AgentOrchestrator() as orchestrator:
+        results = orchestrator.run_all_agents()
     
     # Exibir resumo dos resultados
     for agent_name, result in results.items():
@@ -4,13 +4,13 @@ Agente base que define a interface comum para todos os agentes de coleta.
 
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
+import asyncio
 import logging
-import json
-import os
 from pathlib import Path
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from src.utils.fs import ensure_dir
+from src.utils.json_io import save_json, save_jsonl
+
 logger = logging.getLogger(__name__)
 
 class BaseAgent(ABC):
@@ -28,9 +28,6 @@ class BaseAgent(ABC):
         self.source_name = source_name
         self.data_dir = Path("data/raw") / source_name
         
-        # Criar diretório para armazenar os dados coletados
-        os.makedirs(self.data_dir, exist_ok=True)
-        
         logger.info(f"Agente {source_name} inicializado")
     
     @abstractmethod
@@ -56,6 +53,18 @@ class BaseAgent(ABC):
         """
         pass
     
+    def close(self) -> None:
+        """Libera os recursos do agente (caches, diretórios temporários...)."""
+        pass
+    
+    def __enter__(self):
+        """Permite usar o objeto em um bloco with, liberando os recursos ao final."""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Libera os recursos ao sair do bloco with."""
+        self.close()
+    
     def save_data(self, data: List[Dict[str, Any]], filename: str) -> str:
         """
         Salva os dados em um arquivo JSON.
@@ -70,8 +79,32 @@ class BaseAgent(ABC):
         file_path = self.data_dir / filename
         
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # Criar diretório para armazenar os dados coletados apenas quando houver o que salvar
+            ensure_dir(self.data_dir)
+            save_json(data, file_path)
+            
+            logger.info(f"Dados salvos em {file_path}")
+            return str(file_path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar dados: {e}")
+            return ""
+    
+    def save_data_jsonl(self, data: List[Dict[str, Any]], filename: str) -> str:
+        """
+        Salva os dados em um arquivo JSONL, um item por linha.
+        
+        Args:
+            data: Dados a serem salvos
+            filename: Nome do arquivo
+            
+        Returns:
+            Caminho do arquivo salvo
+        """
+        file_path = self.data_dir / filename
+        
+        try:
+            ensure_dir(self.data_dir)
+            save_jsonl(data, file_path)
             
             logger.info(f"Dados salvos em {file_path}")
             return str(file_path)
@@ -101,17 +134,18 @@ class BaseAgent(ABC):
                     "file_path": ""
                 }
             
-            # Salvar dados brutos
-            raw_file = f"{self.source_name}_raw.json"
-            self.save_data(raw_data, raw_file)
+            # Salvar dados brutos (apenas para diagnóstico)
+            if self.config.get("save_raw", False):
+                raw_file = f"{self.source_name}_raw.json"
+                self.save_data(raw_data, raw_file)
             
             # Processar dados
             logger.info(f"Processando dados de {self.source_name}...")
             processed_data = self.process_data(raw_data)
             
             # Salvar dados processados
-            processed_file = f"{self.source_name}_processed.json"
-            file_path = self.save_data(processed_data, processed_file)
+            processed_file = f"{self.source_name}_processed.jsonl"
+            file_path = self.save_data_jsonl(processed_data, processed_file)
             
             return {
                 "source": self.source_name,
@@ -130,3 +164,15 @@ class BaseAgent(ABC):
                 "data": [],
                 "file_path": ""
             }
+    
+    async def arun(self) -> Dict[str, Any]:
+        """
+        Versão assíncrona de run(), para execução concorrente com outros agentes.
+        
+        A coleta usa bibliotecas bloqueantes, então o fluxo roda em uma thread
+        separada para não bloquear o loop de eventos.
+        
+        Returns:
+            Resultado da execução
+        """
+        return await asyncio.to_thread(self.run)
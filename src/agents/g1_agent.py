@@ -2,24 +2,215 @@
 Agente para coleta de dados do G1 (portal de notícias).
 """
 
-import requests
 from bs4 import BeautifulSoup
+import soupsieve
+import diskcache
+import hashlib
+import heapq
+import html
 import logging
-from typing import List, Dict, Any
+import operator
+import re
+from typing import List, Dict, Any, Optional
 import time
-import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from src.agents.base_agent import BaseAgent
-from src.utils.text_processor import TextProcessor
+from src.utils.http import get_session
+from src.utils.rate_limiter import RateLimiter
+from src.utils.text_processor import TextProcessor, count_words
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Palavras-chave usadas no cálculo de relevância
+_RELEVANCE_KEYWORDS = ("política", "entretenimento", "notícias")
+
+# Categorias padrão usadas quando a configuração não as define
+_DEFAULT_CATEGORIES = ("politica", "economia", "entretenimento")
+
+# Campos de texto simples de uma matéria do G1 e seus seletores CSS (compilados uma única vez)
+_EXTRACT_SPEC = tuple(
+    (field, soupsieve.compile(selector))
+    for field, selector in (
+        ("title", "h1.content-head__title"),
+        ("subtitle", "h2.content-head__subtitle"),
+        ("published_date", "time.content-publication-data__updated"),
+        ("author", "p.content-publication-data__from"),
+    )
+)
+_CONTENT_SELECTOR = soupsieve.compile("div.content-text")
+_BREADCRUMB_SELECTOR = soupsieve.compile("div.breadcrumb")
+_IMAGE_SELECTOR = soupsieve.compile("figure.content-media__image img")
+
+def _class_pattern(tag: str, css_class: str, body: bytes = rb"(.*?)</TAG>") -> "re.Pattern[bytes]":
+    """
+    Gera a expressão regular que localiza um elemento pela tag e por uma de suas classes.
+    
+    Args:
+        tag: Nome da tag HTML
+        css_class: Classe CSS que o elemento deve conter
+        body: Trecho da expressão aplicado após a abertura da tag
+        
+    Returns:
+        Expressão regular compilada sobre bytes
+    """
+    opening = rb'<%s\b[^>]*\bclass="(?:[^"]*\s)?%s(?:\s[^"]*)?"[^>]*>' % (tag.encode(), css_class.encode())
+    return re.compile(opening + body.replace(b"TAG", tag.encode()), re.S | re.I)
+
+# Extrator especializado no template de matérias do G1: expressões regulares sobre o HTML bruto,
+# geradas a partir das mesmas classes usadas pelos seletores CSS acima
+_FAST_FIELD_PATTERNS = tuple(
+    (field, css_class.encode(), _class_pattern(tag, css_class))
+    for field, tag, css_class in (
+        ("title", "h1", "content-head__title"),
+        ("subtitle", "h2", "content-head__subtitle"),
+        ("published_date", "time", "content-publication-data__updated"),
+        ("author", "p", "content-publication-data__from"),
+    )
+)
+_FAST_CONTENT_RE = _class_pattern("div", "content-text", rb"(.*?)</div>")
+_FAST_BREADCRUMB_RE = _class_pattern("div", "breadcrumb", rb"(.*?)</div>")
+_FAST_IMAGE_RE = _class_pattern("figure", "content-media__image", rb'(?:(?!</figure>).)*?<img\b[^>]*?\ssrc="([^"]*)"')
+_PARAGRAPH_RE = re.compile(rb"<p\b[^>]*>(.*?)</p>", re.S | re.I)
+_ANCHOR_RE = re.compile(rb"<a\b[^>]*>(.*?)</a>", re.S | re.I)
+_TAG_RE = re.compile(rb"<[^>]*>")
+_NESTED_DIV_RE = re.compile(rb"<div\b", re.I)
+
+def _fast_text(fragment: bytes) -> str:
+    """
+    Converte um trecho de HTML em texto, removendo tags e decodificando entidades.
+    
+    Args:
+        fragment: Trecho de HTML em bytes
+        
+    Returns:
+        Texto sem formatação
+    """
+    return html.unescape(_TAG_RE.sub(b"", fragment).decode("utf-8")).strip()
+
+def _extract_fast(page: bytes) -> Optional[Dict[str, str]]:
+    """
+    Extrai os campos de uma matéria diretamente do HTML bruto, sem montar a árvore DOM.
+    
+    Qualquer elemento cuja classe aparece na página mas não é reconhecido pelas
+    expressões regulares faz a função desistir, para que o chamador use o BeautifulSoup.
+    
+    Args:
+        page: HTML da matéria em bytes
+        
+    Returns:
+        Campos extraídos, ou None se a página fugir do template esperado
+    """
+    try:
+        fields = {}
+        for field, css_class, pattern in _FAST_FIELD_PATTERNS:
+            match = pattern.search(page)
+            if match is None:
+                if css_class in page:
+                    return None
+                fields[field] = ""
+            else:
+                fields[field] = _fast_text(match.group(1))
+        
+        # Conteúdo: parágrafos do primeiro bloco de texto (sem blocos aninhados)
+        fields["content"] = ""
+        match = _FAST_CONTENT_RE.search(page)
+        if match is not None:
+            block = match.group(1)
+            if _NESTED_DIV_RE.search(block):
+                return None
+            fields["content"] = ' '.join([_fast_text(p) for p in _PARAGRAPH_RE.findall(block)])
+        elif b"content-text" in page:
+            return None
+        
+        # Categoria/editoria: segundo link do breadcrumb
+        fields["category"] = ""
+        match = _FAST_BREADCRUMB_RE.search(page)
+        if match is not None:
+            block = match.group(1)
+            if _NESTED_DIV_RE.search(block):
+                return None
+            links = _ANCHOR_RE.findall(block)
+            if len(links) > 1:
+                fields["category"] = _fast_text(links[1])
+        elif b"breadcrumb" in page:
+            return None
+        
+        # Imagem principal
+        fields["image_url"] = ""
+        match = _FAST_IMAGE_RE.search(page)
+        if match is not None:
+            fields["image_url"] = html.unescape(match.group(1).decode("utf-8"))
+        elif b"content-media__image" in page:
+            return None
+        
+        return fields
+    except UnicodeDecodeError:
+        return None
+
+def _extract_with_soup(page: str) -> Dict[str, str]:
+    """
+    Extrai os campos de uma matéria navegando pela árvore DOM.
+    
+    Args:
+        page: HTML da matéria
+        
+    Returns:
+        Campos extraídos
+    """
+    soup = BeautifulSoup(page, 'lxml')
+    
+    # Extrair título, subtítulo, data de publicação e autor
+    fields = {}
+    for field, selector in _EXTRACT_SPEC:
+        tag = selector.select_one(soup)
+        fields[field] = tag.text.strip() if tag else ""
+    
+    # Extrair conteúdo
+    fields["content"] = ""
+    content_div = _CONTENT_SELECTOR.select_one(soup)
+    if content_div:
+        paragraphs = content_div.find_all('p')
+        fields["content"] = ' '.join([p.text.strip() for p in paragraphs])
+    
+    # Extrair categoria/editoria
+    fields["category"] = ""
+    breadcrumb = _BREADCRUMB_SELECTOR.select_one(soup)
+    if breadcrumb:
+        links = breadcrumb.find_all('a')
+        if links and len(links) > 1:
+            fields["category"] = links[1].text.strip()
+    
+    # Extrair imagem principal
+    fields["image_url"] = ""
+    img = _IMAGE_SELECTOR.select_one(soup)
+    if img and 'src' in img.attrs:
+        fields["image_url"] = img['src']
+    
+    return fields
+
+# Chave de ordenação dos artigos processados
+_by_score = operator.itemgetter("relevance_score")
+
+# Tempo máximo que uma entrada permanece no cache em disco, mesmo sem ser revalidada
+_CACHE_RETENTION = 7 * 24 * 3600
+
 class G1Agent(BaseAgent):
     """Agente para coleta de dados do portal G1."""
     
+    # Caminhos das categorias no portal, relativos à URL base
+    _CATEGORY_PATHS = {
+        "politica": "/politica/",
+        "economia": "/economia/",
+        "entretenimento": "/pop-arte/",
+        "tecnologia": "/tecnologia/",
+        "esportes": "/esporte/",
+        "educacao": "/educacao/",
+        "saude": "/ciencia-e-saude/",
+        "mundo": "/mundo/"
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Inicializa o agente do G1.
@@ -29,11 +220,28 @@ class G1Agent(BaseAgent):
         """
         super().__init__(config, "g1")
         self.base_url = config.get("base_url", "https://g1.globo.com")
-        self.categories = config.get("categories", ["politica", "economia", "entretenimento"])
+        self.categories = tuple(config.get("categories", _DEFAULT_CATEGORIES))
         self.max_articles = config.get("max_articles", 10)
+        
+        # Limite de artigos por categoria (ao menos um por categoria)
+        self.max_per_category = max(1, self.max_articles // len(self.categories)) if self.categories else 0
+        self.max_workers = config.get("max_workers", 8)
         self.text_processor = TextProcessor()
         
-        logger.info(f"Agente G1 inicializado com categorias: {self.categories}")
+        # Limitar a taxa de requisições ao portal, já que as páginas são baixadas em paralelo
+        self.rate_limiter = RateLimiter(
+            rate=config.get("requests_per_second", 2.0),
+            capacity=config.get("burst", 4)
+        )
+        
+        # Cache persistente de artigos já extraídos, indexado pelo hash da URL
+        self.cache = diskcache.Cache(config.get("cache_dir", "data/cache/g1"))
+        self.cache_ttl = config.get("cache_ttl", 6 * 3600)
+        
+        # Sessão HTTP do processo, compartilhada com os demais componentes (keep-alive)
+        self.session = get_session()
+        
+        logger.info("Agente G1 inicializado com categorias: %s", self.categories)
     
     def _get_category_url(self, category: str) -> str:
         """
@@ -45,20 +253,9 @@ class G1Agent(BaseAgent):
         Returns:
             URL da categoria
         """
-        category_mapping = {
-            "politica": f"{self.base_url}/politica/",
-            "economia": f"{self.base_url}/economia/",
-            "entretenimento": f"{self.base_url}/pop-arte/",
-            "tecnologia": f"{self.base_url}/tecnologia/",
-            "esportes": f"{self.base_url}/esporte/",
-            "educacao": f"{self.base_url}/educacao/",
-            "saude": f"{self.base_url}/ciencia-e-saude/",
-            "mundo": f"{self.base_url}/mundo/"
-        }
-        
-        return category_mapping.get(category.lower(), f"{self.base_url}")
+        return f"{self.base_url}{self._CATEGORY_PATHS.get(category.lower(), '')}"
     
-    def _extract_article_data(self, article_url: str) -> Dict[str, Any]:
+    def _extract_article_data(self, article_url: str) -> Optional[Dict[str, Any]]:
         """
         Extrai dados de um artigo.
         
@@ -66,93 +263,124 @@ class G1Agent(BaseAgent):
             article_url: URL do artigo
             
         Returns:
-            Dados do artigo
+            Dados do artigo, ou None se a extração falhar
         """
+        cache_key = hashlib.sha256(article_url.encode("utf-8")).hexdigest()
+        cached = self.cache.get(cache_key)
+        
+        # Reaproveitar artigos extraídos recentemente sem nova requisição
+        if cached is not None and time.time() - cached["fetched_at"] < self.cache_ttl:
+            return cached["data"]
+        
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+            # Revalidar a entrada expirada com um GET condicional
+            headers = {}
+            if cached is not None:
+                if cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+            
+            self.rate_limiter.acquire()
+            response = self.session.get(article_url, headers=headers, timeout=10)
+            
+            if response.status_code == 304 and cached is not None:
+                cached["fetched_at"] = time.time()
+                self.cache.set(cache_key, cached, expire=_CACHE_RETENTION)
+                return cached["data"]
             
-            response = requests.get(article_url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Tentar o extrator especializado; recorrer ao BeautifulSoup se a página fugir do template
+            fields = _extract_fast(response.content)
+            if fields is None:
+                fields = _extract_with_soup(response.text)
             
-            # Extrair título
-            title = ""
-            title_tag = soup.find('h1', class_='content-head__title')
-            if title_tag:
-                title = title_tag.text.strip()
+            article_data = {
+                "title": fields["title"],
+                "subtitle": fields["subtitle"],
+                "content": fields["content"],
+                "url": article_url,
+                "published_date": fields["published_date"],
+                "author": fields["author"],
+                "category": fields["category"],
+                "image_url": fields["image_url"],
+                "source": "G1",
+                "collected_at": datetime.now()
+            }
             
-            # Extrair subtítulo
-            subtitle = ""
-            subtitle_tag = soup.find('h2', class_='content-head__subtitle')
-            if subtitle_tag:
-                subtitle = subtitle_tag.text.strip()
+            if article_data["title"]:
+                self.cache.set(cache_key, {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                    "data": article_data
+                }, expire=_CACHE_RETENTION)
             
-            # Extrair conteúdo
-            content = ""
-            content_div = soup.find('div', class_='content-text')
-            if content_div:
-                paragraphs = content_div.find_all('p')
-                content = ' '.join([p.text.strip() for p in paragraphs])
+            return article_data
+        
+        except Exception as e:
+            logger.error("Erro ao extrair dados do artigo %s: %s", article_url, e)
+            return None
+    
+    def _get_article_links(self, category: str) -> List[str]:
+        """
+        Obtém os links dos artigos listados na página de uma categoria.
+        
+        Args:
+            category: Nome da categoria
             
-            # Extrair data de publicação
-            published_date = ""
-            date_tag = soup.find('time', class_='content-publication-data__updated')
-            if date_tag:
-                published_date = date_tag.text.strip()
+        Returns:
+            Lista de URLs de artigos
+        """
+        category_url = self._get_category_url(category)
+        logger.info("Coletando artigos da categoria: %s (%s)", category, category_url)
+        
+        # Revalidar a página da categoria com um GET condicional
+        cache_key = ("index", category_url)
+        cached = self.cache.get(cache_key)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        
+        self.rate_limiter.acquire()
+        response = self.session.get(category_url, headers=headers, timeout=10)
+        
+        if response.status_code == 304 and cached is not None:
+            # Página inalterada: reaproveitar os links já extraídos
+            article_links = cached["links"]
+        else:
+            response.raise_for_status()
             
-            # Extrair autor
-            author = ""
-            author_tag = soup.find('p', class_='content-publication-data__from')
-            if author_tag:
-                author = author_tag.text.strip()
+            soup = BeautifulSoup(response.text, 'lxml')
             
-            # Extrair categoria/editoria
-            category = ""
-            breadcrumb = soup.find('div', class_='breadcrumb')
-            if breadcrumb:
-                links = breadcrumb.find_all('a')
-                if links and len(links) > 1:
-                    category = links[1].text.strip()
+            # Encontrar links de artigos
+            article_links = []
+            feed_posts = soup.find_all('div', class_='feed-post')
             
-            # Extrair imagem principal
-            image_url = ""
-            figure = soup.find('figure', class_='content-media__image')
-            if figure:
-                img = figure.find('img')
-                if img and 'src' in img.attrs:
-                    image_url = img['src']
+            for post in feed_posts:
+                link = post.find('a')
+                if link and 'href' in link.attrs:
+                    article_url = link['href']
+                    if not article_url.startswith('http'):
+                        article_url = f"https:{article_url}"
+                    article_links.append(article_url)
             
-            return {
-                "title": title,
-                "subtitle": subtitle,
-                "content": content,
-                "url": article_url,
-                "published_date": published_date,
-                "author": author,
-                "category": category,
-                "image_url": image_url,
-                "source": "G1",
-                "collected_at": datetime.now().isoformat()
-            }
+            if response.headers.get("ETag") or response.headers.get("Last-Modified"):
+                self.cache.set(cache_key, {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "links": article_links
+                }, expire=_CACHE_RETENTION)
         
-        except Exception as e:
-            logger.error(f"Erro ao extrair dados do artigo {article_url}: {e}")
-            return {
-                "title": "",
-                "subtitle": "",
-                "content": "",
-                "url": article_url,
-                "published_date": "",
-                "author": "",
-                "category": "",
-                "image_url": "",
-                "source": "G1",
-                "collected_at": datetime.now().isoformat(),
-                "error": str(e)
-            }
+        # Limitar o número de artigos por categoria
+        article_links = article_links[:self.max_per_category]
+        
+        logger.info("Encontrados %d artigos na categoria %s", len(article_links), category)
+        return article_links
     
     def collect_data(self) -> List[Dict[str, Any]]:
         """
@@ -161,66 +389,50 @@ class G1Agent(BaseAgent):
         Returns:
             Lista de artigos coletados
         """
+        if not self.categories:
+            logger.warning("Nenhuma categoria configurada para o G1")
+            return []
+        
         all_articles = []
         
-        for category in self.categories:
-            try:
-                category_url = self._get_category_url(category)
-                logger.info(f"Coletando artigos da categoria: {category} ({category_url})")
-                
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                
-                response = requests.get(category_url, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Encontrar links de artigos
-                article_links = []
-                feed_posts = soup.find_all('div', class_='feed-post')
-                
-                for post in feed_posts:
-                    link = post.find('a')
-                    if link and 'href' in link.attrs:
-                        article_url = link['href']
-                        if not article_url.startswith('http'):
-                            article_url = f"https:{article_url}"
-                        article_links.append(article_url)
-                
-                # Limitar o número de artigos por categoria
-                max_per_category = min(len(article_links), self.max_articles // len(self.categories))
-                article_links = article_links[:max_per_category]
-                
-                logger.info(f"Encontrados {len(article_links)} artigos na categoria {category}")
-                
-                # Extrair dados de cada artigo
-                for url in article_links:
-                    article_data = self._extract_article_data(url)
-                    if article_data.get("title"):  # Verificar se o artigo foi extraído com sucesso
-                        all_articles.append(article_data)
-                    
-                    # Pausa para evitar sobrecarga no servidor
-                    time.sleep(random.uniform(1, 3))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Buscar as páginas das categorias em paralelo
+            link_futures = {
+                category: executor.submit(self._get_article_links, category)
+                for category in self.categories
+            }
             
-            except Exception as e:
-                logger.error(f"Erro ao coletar artigos da categoria {category}: {e}")
+            article_links = []
+            for category, future in link_futures.items():
+                try:
+                    article_links.extend(future.result())
+                except Exception as e:
+                    logger.error("Erro ao coletar artigos da categoria %s: %s", category, e)
+            
+            # Extrair dados de cada artigo em paralelo, respeitando o limitador de taxa
+            for article_data in executor.map(self._extract_article_data, article_links):
+                if article_data is not None and article_data["title"]:  # Verificar se o artigo foi extraído com sucesso
+                    all_articles.append(article_data)
         
-        logger.info(f"Total de {len(all_articles)} artigos coletados do G1")
+        logger.info("Total de %d artigos coletados do G1", len(all_articles))
         return all_articles
     
-    def process_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def process_data(self, data: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Processa os dados coletados do G1.
         
         Args:
             data: Dados coletados
+            top_k: Número de artigos mais relevantes a manter (padrão: config "top_k"; None mantém todos)
             
         Returns:
             Dados processados
         """
+        if top_k is None:
+            top_k = self.config.get("top_k")
+        
         processed_articles = []
+        processed_at = datetime.now()
         
         for article in data:
             try:
@@ -231,6 +443,10 @@ class G1Agent(BaseAgent):
                 # Limpar o texto
                 cleaned_content = self.text_processor.clean_text(article.get("content", ""))
                 
+                # Ignorar artigos sem conteúdo após a limpeza
+                if not cleaned_content:
+                    continue
+                
                 # Criar resumo
                 summary = self.text_processor.summarize_text(cleaned_content)
                 
@@ -238,9 +454,8 @@ class G1Agent(BaseAgent):
                 entities = self.text_processor.extract_entities(cleaned_content)
                 
                 # Calcular relevância (exemplo simples)
-                relevance_keywords = ["política", "entretenimento", "notícias"]
                 relevance_score = self.text_processor.calculate_relevance_score(
-                    cleaned_content, relevance_keywords
+                    cleaned_content, _RELEVANCE_KEYWORDS
                 )
                 
                 # Criar artigo processado
@@ -257,17 +472,24 @@ class G1Agent(BaseAgent):
                     "source": "G1",
                     "entities": entities,
                     "relevance_score": relevance_score,
-                    "word_count": len(cleaned_content.split()),
-                    "processed_at": datetime.now().isoformat()
+                    "word_count": count_words(cleaned_content),
+                    "processed_at": processed_at
                 }
                 
                 processed_articles.append(processed_article)
             
             except Exception as e:
-                logger.error(f"Erro ao processar artigo: {e}")
+                logger.error("Erro ao processar artigo: %s", e)
         
-        # Ordenar por relevância
-        processed_articles.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+        # Ordenar por relevância (ou selecionar apenas os K mais relevantes)
+        if top_k:
+            processed_articles = heapq.nlargest(top_k, processed_articles, key=_by_score)
+        else:
+            processed_articles.sort(key=_by_score, reverse=True)
         
-        logger.info(f"Processados {len(processed_articles)} artigos do G1")
+        logger.info("Processados %d artigos do G1", len(processed_articles))
         return processed_articles
+    
+    def close(self) -> None:
+        """Fecha o cache em disco (a sessão HTTP é compartilhada e fechada pelo chamador)."""
+        self.cache.close()
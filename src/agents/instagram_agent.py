@@ -3,22 +3,79 @@ Agente para coleta de dados do Instagram usando Instaloader.
 """
 
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime
+import threading
 import time
-import random
+import queue
+from contextlib import contextmanager
+import numpy as np
+import diskcache
 import instaloader
-import os
 import tempfile
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from src.agents.base_agent import BaseAgent
-from src.utils.text_processor import TextProcessor
+from src.utils.rate_limiter import RateLimiter
+from src.utils.ranking import rank_indices
+from src.utils.text_processor import TextProcessor, analyze_texts
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Palavras-chave usadas no cálculo de relevância
+_RELEVANCE_KEYWORDS = ("política", "entretenimento", "notícias")
+
+# Valores padrão usados quando a configuração não os define
+_DEFAULT_PROFILES = ("g1", "bbcbrasil", "cnnbrasil")
+_DEFAULT_HASHTAGS = ("noticia", "politica", "entretenimento")
+
+# Prefixo das URLs públicas dos posts
+_POST_URL_PREFIX = "https://www.instagram.com/p/"
+
+class _SharedRateController(instaloader.RateController):
+    """Controle de taxa do Instaloader que, antes de cada requisição, também consome um token do limitador compartilhado."""
+    
+    def __init__(self, context: instaloader.InstaloaderContext, rate_limiter: RateLimiter):
+        """
+        Inicializa o controle de taxa.
+        
+        Args:
+            context: Contexto do Instaloader
+            rate_limiter: Limitador de taxa compartilhado por todos os Instaloaders do agente
+        """
+        super().__init__(context)
+        self._rate_limiter = rate_limiter
+    
+    def wait_before_query(self, query_type: str) -> None:
+        """
+        Aguarda o limitador compartilhado e, em seguida, as pausas padrão do Instaloader.
+        
+        Args:
+            query_type: Tipo da consulta, conforme o Instaloader
+        """
+        self._rate_limiter.acquire()
+        super().wait_before_query(query_type)
+
+@dataclass(slots=True)
+class PostRecord:
+    """Post coletado do Instagram, com campos fixos (mais leve que um dicionário por post)."""
+    
+    id: str
+    caption: str
+    date: datetime
+    likes: int
+    comments: int
+    url: str
+    is_video: bool
+    location: str
+    hashtags: List[str]
+    mentions: List[str]
+    profile: Dict[str, Any]
+    collected_at: datetime
+    source: str = field(default="Instagram")
+
 class InstagramAgent(BaseAgent):
     """Agente para coleta de dados do Instagram."""
     
@@ -30,13 +87,53 @@ class InstagramAgent(BaseAgent):
             config: Configurações do agente
         """
         super().__init__(config, "instagram")
-        self.profiles = config.get("profiles", ["g1", "bbcbrasil", "cnnbrasil"])
-        self.hashtags = config.get("hashtags", ["noticia", "politica", "entretenimento"])
+        self.profiles = tuple(config.get("profiles", _DEFAULT_PROFILES))
+        self.hashtags = tuple(config.get("hashtags", _DEFAULT_HASHTAGS))
         self.max_posts = config.get("max_posts", 20)
+        self.max_workers = config.get("max_workers", 4)
+        self.max_retries = config.get("max_retries", 3)
+        
+        # Perfis já consultados nesta execução: (nome, Instaloader usado) -> (instante da consulta, perfil)
+        self.profile_cache_ttl = config.get("profile_cache_ttl", 600)
+        self._profile_cache = {}
+        self._profile_cache_lock = threading.Lock()
+        
+        # Cache persistente dos posts coletados por perfil/hashtag, reaproveitado entre execuções
+        self.cache = diskcache.Cache(config.get("cache_dir", "data/cache/instagram"))
+        self.profile_posts_ttl = config.get("profile_posts_ttl", 3600)
+        self.hashtag_posts_ttl = config.get("hashtag_posts_ttl", 15 * 60)
         self.text_processor = TextProcessor()
         
-        # Inicializar o Instaloader
-        self.loader = instaloader.Instaloader(
+        # Limitar a taxa de requisições HTTP ao Instagram, compartilhada entre todas as threads
+        self.rate_limiter = RateLimiter(
+            rate=config.get("requests_per_minute", 30) / 60,
+            capacity=config.get("burst", 5)
+        )
+        
+        # Um Instaloader por thread de coleta: o contexto de cada um (sessão HTTP, controle de taxa
+        # e login) não é seguro para uso simultâneo entre threads
+        self._loaders = queue.SimpleQueue()
+        self._all_loaders = [self._create_loader() for _ in range(self.max_workers)]
+        for loader in self._all_loaders:
+            self._loaders.put(loader)
+        
+        # Criar diretório temporário para downloads (removido em close(), ou ao fim do processo)
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self.temp_dir = self._temp_dir.name
+        
+        logger.info(f"Agente Instagram inicializado com perfis: {self.profiles} e hashtags: {self.hashtags}")
+    
+    def _create_loader(self) -> instaloader.Instaloader:
+        """
+        Cria um Instaloader configurado apenas para leitura de metadados.
+        
+        Returns:
+            Instaloader sem downloads de mídia, cujas requisições passam pelo limitador de taxa compartilhado
+            (novas tentativas e esperas após HTTP 429 ficam a cargo do próprio Instaloader)
+        """
+        return instaloader.Instaloader(
+            max_connection_attempts=self.max_retries,
+            rate_controller=lambda context: _SharedRateController(context, self.rate_limiter),
             download_pictures=False,
             download_videos=False,
             download_video_thumbnails=False,
@@ -45,13 +142,45 @@ class InstagramAgent(BaseAgent):
             save_metadata=False,
             compress_json=False
         )
+    
+    @contextmanager
+    def _checkout_loader(self) -> Iterator[instaloader.Instaloader]:
+        """
+        Reserva um Instaloader para uso exclusivo da thread atual, devolvendo-o ao final.
         
-        # Criar diretório temporário para downloads
-        self.temp_dir = tempfile.mkdtemp()
+        Yields:
+            Instaloader reservado
+        """
+        loader = self._loaders.get()
+        try:
+            yield loader
+        finally:
+            self._loaders.put(loader)
+    
+    def _get_profile(self, loader: instaloader.Instaloader, profile_name: str) -> instaloader.Profile:
+        """
+        Obtém um perfil do Instagram, reaproveitando consultas recentes feitas com o mesmo Instaloader.
         
-        logger.info(f"Agente Instagram inicializado com perfis: {self.profiles} e hashtags: {self.hashtags}")
+        Args:
+            loader: Instaloader reservado pela thread atual (o perfil faz novas requisições pelo seu contexto)
+            profile_name: Nome do perfil
+            
+        Returns:
+            Perfil do Instagram
+        """
+        cache_key = (profile_name, id(loader))
+        with self._profile_cache_lock:
+            cached = self._profile_cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self.profile_cache_ttl:
+            return cached[1]
+        
+        profile = instaloader.Profile.from_username(loader.context, profile_name)
+        
+        with self._profile_cache_lock:
+            self._profile_cache[cache_key] = (time.monotonic(), profile)
+        return profile
     
-    def _get_profile_posts(self, profile_name: str, max_count: int = 10) -> List[Dict[str, Any]]:
+    def _get_profile_posts(self, profile_name: str, max_count: int = 10) -> List[PostRecord]:
         """
         Obtém posts de um perfil do Instagram.
         
@@ -62,46 +191,54 @@ class InstagramAgent(BaseAgent):
         Returns:
             Lista de posts do perfil
         """
+        cache_key = ("profile", profile_name, max_count)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Usando {len(cached)} posts em cache do perfil {profile_name}")
+            return cached
+        
         posts = []
+        collected_at = datetime.now()
         
         try:
-            # Obter perfil
-            profile = instaloader.Profile.from_username(self.loader.context, profile_name)
-            
-            # Obter posts
-            count = 0
-            for post in profile.get_posts():
-                if count >= max_count:
-                    break
-                
-                # Extrair dados do post
-                post_data = {
-                    "id": post.shortcode,
-                    "caption": post.caption if post.caption else "",
-                    "date": post.date_local.isoformat(),
-                    "likes": post.likes,
-                    "comments": post.comments,
-                    "url": f"https://www.instagram.com/p/{post.shortcode}/",
-                    "is_video": post.is_video,
-                    "location": post.location.name if post.location else "",
-                    "hashtags": list(post.caption_hashtags) if post.caption else [],
-                    "mentions": list(post.caption_mentions) if post.caption else [],
-                    "profile": {
-                        "username": profile.username,
-                        "full_name": profile.full_name,
-                        "followers": profile.followers,
-                        "biography": profile.biography,
-                        "is_verified": profile.is_verified
-                    },
-                    "source": "Instagram",
-                    "collected_at": datetime.now().isoformat()
-                }
+            # Reservar um Instaloader para toda a coleta (inclusive propriedades carregadas sob demanda)
+            with self._checkout_loader() as loader:
+                # Obter perfil
+                profile = self._get_profile(loader, profile_name)
                 
-                posts.append(post_data)
-                count += 1
-                
-                # Pausa para evitar limitação de taxa
-                time.sleep(random.uniform(1, 2))
+                # Obter posts
+                post_iterator = profile.get_posts()
+                for _ in range(max_count):
+                    post = next(post_iterator, None)
+                    if post is None:
+                        break
+                    
+                    # Extrair dados do post
+                    post_data = PostRecord(
+                        id=post.shortcode,
+                        caption=post.caption if post.caption else "",
+                        date=post.date_local,
+                        likes=post.likes,
+                        comments=post.comments,
+                        url=_POST_URL_PREFIX + post.shortcode + "/",
+                        is_video=post.is_video,
+                        location=post.location.name if post.location else "",
+                        hashtags=list(post.caption_hashtags) if post.caption else [],
+                        mentions=list(post.caption_mentions) if post.caption else [],
+                        profile={
+                            "username": profile.username,
+                            "full_name": profile.full_name,
+                            "followers": profile.followers,
+                            "biography": profile.biography,
+                            "is_verified": profile.is_verified
+                        },
+                        collected_at=collected_at
+                    )
+                    
+                    posts.append(post_data)
+            
+            if posts:
+                self.cache.set(cache_key, posts, expire=self.profile_posts_ttl)
             
             logger.info(f"Coletados {len(posts)} posts do perfil {profile_name}")
             return posts
@@ -110,7 +247,7 @@ class InstagramAgent(BaseAgent):
             logger.error(f"Erro ao coletar posts do perfil {profile_name}: {e}")
             return []
     
-    def _get_hashtag_posts(self, hashtag: str, max_count: int = 10) -> List[Dict[str, Any]]:
+    def _get_hashtag_posts(self, hashtag: str, max_count: int = 10) -> List[PostRecord]:
         """
         Obtém posts de uma hashtag do Instagram.
         
@@ -121,40 +258,48 @@ class InstagramAgent(BaseAgent):
         Returns:
             Lista de posts da hashtag
         """
+        cache_key = ("hashtag", hashtag, max_count)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Usando {len(cached)} posts em cache da hashtag #{hashtag}")
+            return cached
+        
         posts = []
+        collected_at = datetime.now()
         
         try:
-            # Obter posts da hashtag
-            count = 0
-            for post in self.loader.get_hashtag_posts(hashtag):
-                if count >= max_count:
-                    break
-                
-                # Extrair dados do post
-                post_data = {
-                    "id": post.shortcode,
-                    "caption": post.caption if post.caption else "",
-                    "date": post.date_local.isoformat(),
-                    "likes": post.likes,
-                    "comments": post.comments,
-                    "url": f"https://www.instagram.com/p/{post.shortcode}/",
-                    "is_video": post.is_video,
-                    "location": post.location.name if post.location else "",
-                    "hashtags": list(post.caption_hashtags) if post.caption else [],
-                    "mentions": list(post.caption_mentions) if post.caption else [],
-                    "profile": {
-                        "username": post.owner_username,
-                        "profile_id": post.owner_id
-                    },
-                    "source": "Instagram",
-                    "collected_at": datetime.now().isoformat()
-                }
-                
-                posts.append(post_data)
-                count += 1
-                
-                # Pausa para evitar limitação de taxa
-                time.sleep(random.uniform(1, 2))
+            # Reservar um Instaloader para toda a coleta (inclusive propriedades carregadas sob demanda)
+            with self._checkout_loader() as loader:
+                # Obter posts da hashtag
+                post_iterator = loader.get_hashtag_posts(hashtag)
+                for _ in range(max_count):
+                    post = next(post_iterator, None)
+                    if post is None:
+                        break
+                    
+                    # Extrair dados do post
+                    post_data = PostRecord(
+                        id=post.shortcode,
+                        caption=post.caption if post.caption else "",
+                        date=post.date_local,
+                        likes=post.likes,
+                        comments=post.comments,
+                        url=_POST_URL_PREFIX + post.shortcode + "/",
+                        is_video=post.is_video,
+                        location=post.location.name if post.location else "",
+                        hashtags=list(post.caption_hashtags) if post.caption else [],
+                        mentions=list(post.caption_mentions) if post.caption else [],
+                        profile={
+                            "username": post.owner_username,
+                            "profile_id": post.owner_id
+                        },
+                        collected_at=collected_at
+                    )
+                    
+                    posts.append(post_data)
+            
+            if posts:
+                self.cache.set(cache_key, posts, expire=self.hashtag_posts_ttl)
             
             logger.info(f"Coletados {len(posts)} posts da hashtag #{hashtag}")
             return posts
@@ -163,7 +308,7 @@ class InstagramAgent(BaseAgent):
             logger.error(f"Erro ao coletar posts da hashtag #{hashtag}: {e}")
             return []
     
-    def collect_data(self) -> List[Dict[str, Any]]:
+    def collect_data(self) -> List[PostRecord]:
         """
         Coleta dados do Instagram.
         
@@ -171,114 +316,128 @@ class InstagramAgent(BaseAgent):
             Lista de posts coletados
         """
         all_posts = []
+        seen_ids = set()
         
-        # Coletar posts de perfis
-        for profile in self.profiles:
-            try:
+        # Coletar posts de perfis e hashtags em paralelo, com número limitado de requisições simultâneas
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            for profile in self.profiles:
                 logger.info(f"Coletando posts do perfil: {profile}")
-                posts = self._get_profile_posts(profile, max_count=min(self.max_posts // len(self.profiles), 10))
-                all_posts.extend(posts)
-            except Exception as e:
-                logger.error(f"Erro ao coletar posts do perfil {profile}: {e}")
-        
-        # Coletar posts de hashtags
-        for hashtag in self.hashtags:
-            try:
+                futures.append((f"do perfil {profile}", executor.submit(
+                    self._get_profile_posts, profile, max_count=min(self.max_posts // len(self.profiles), 10)
+                )))
+            
+            for hashtag in self.hashtags:
                 logger.info(f"Coletando posts da hashtag: #{hashtag}")
-                posts = self._get_hashtag_posts(hashtag, max_count=min(self.max_posts // len(self.hashtags), 10))
-                all_posts.extend(posts)
-            except Exception as e:
-                logger.error(f"Erro ao coletar posts da hashtag #{hashtag}: {e}")
-        
-        # Remover duplicatas (pelo ID do post)
-        unique_posts = {post['id']: post for post in all_posts if 'id' in post}
-        all_posts = list(unique_posts.values())
+                futures.append((f"da hashtag #{hashtag}", executor.submit(
+                    self._get_hashtag_posts, hashtag, max_count=min(self.max_posts // len(self.hashtags), 10)
+                )))
+            
+            # Reunir os resultados na ordem de submissão, descartando duplicatas (pelo ID do post)
+            for target, future in futures:
+                try:
+                    posts = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao coletar posts {target}: {e}")
+                    continue
+                
+                for post in posts:
+                    if post.id and post.id not in seen_ids:
+                        seen_ids.add(post.id)
+                        all_posts.append(post)
         
         logger.info(f"Total de {len(all_posts)} posts coletados do Instagram")
         return all_posts
     
-    def process_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def process_data(self, data: List[PostRecord], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Processa os dados coletados do Instagram.
         
         Args:
             data: Dados coletados
+            top_k: Número de posts mais bem pontuados a manter (padrão: config "top_k"; None mantém todos)
             
         Returns:
             Dados processados
         """
+        if top_k is None:
+            top_k = self.config.get("top_k")
+        
         processed_posts = []
+        processed_at = datetime.now()
+        
+        # Métricas dos posts processados (em paralelo à lista), usadas no cálculo em lote após o loop
+        likes = []
+        comments = []
+        followers = []
+        relevance_scores = []
+        
+        # Limpar as legendas, calcular relevância e extrair entidades (em vários processos se o volume justificar)
+        posts = [post for post in data if post.caption]
+        analyses = analyze_texts([post.caption for post in posts], _RELEVANCE_KEYWORDS, self.text_processor)
         
-        for post in data:
+        for post, analysis in zip(posts, analyses):
+            if analysis is None:
+                continue
+            
             try:
-                # Verificar se o post tem conteúdo
-                if not post.get("caption"):
-                    continue
-                
-                # Limpar o texto
-                cleaned_caption = self.text_processor.clean_text(post.get("caption", ""))
-                
-                # Calcular engajamento
-                engagement_score = post.get("likes", 0) + post.get("comments", 0) * 2
-                
-                # Normalizar engajamento com base nos seguidores (se disponível)
-                followers = post.get("profile", {}).get("followers", 0)
-                if followers > 0:
-                    normalized_engagement = engagement_score / (followers ** 0.5)
-                else:
-                    normalized_engagement = 0
-                
-                # Calcular relevância
-                relevance_keywords = ["política", "entretenimento", "notícias"]
-                relevance_score = self.text_processor.calculate_relevance_score(
-                    cleaned_caption, relevance_keywords
-                )
-                
-                # Extrair entidades
-                entities = self.text_processor.extract_entities(cleaned_caption)
+                cleaned_caption, relevance_score, entities, word_count = analysis
                 
                 # Criar post processado
                 processed_post = {
-                    "id": post.get("id", ""),
+                    "id": post.id,
                     "caption": cleaned_caption,
-                    "date": post.get("date", ""),
-                    "url": post.get("url", ""),
-                    "profile": post.get("profile", {}),
+                    "date": post.date,
+                    "url": post.url,
+                    "profile": post.profile,
                     "engagement": {
-                        "likes": post.get("likes", 0),
-                        "comments": post.get("comments", 0),
-                        "total_engagement": engagement_score,
-                        "normalized_engagement": normalized_engagement
+                        "likes": post.likes,
+                        "comments": post.comments
                     },
-                    "hashtags": post.get("hashtags", []),
-                    "mentions": post.get("mentions", []),
+                    "hashtags": post.hashtags,
+                    "mentions": post.mentions,
                     "source": "Instagram",
                     "entities": entities,
                     "relevance_score": relevance_score,
-                    "word_count": len(cleaned_caption.split()),
-                    "processed_at": datetime.now().isoformat()
+                    "word_count": word_count,
+                    "processed_at": processed_at
                 }
                 
+                likes.append(post.likes)
+                comments.append(post.comments)
+                followers.append(post.profile.get("followers", 0))
+                relevance_scores.append(relevance_score)
                 processed_posts.append(processed_post)
             
             except Exception as e:
                 logger.error(f"Erro ao processar post: {e}")
         
-        # Ordenar por engajamento normalizado e relevância
-        processed_posts.sort(
-            key=lambda x: (
-                x.get("engagement", {}).get("normalized_engagement", 0) * 0.7 + 
-                x.get("relevance_score", 0) * 0.3
-            ), 
-            reverse=True
-        )
+        if processed_posts:
+            # Calcular engajamento
+            engagement_scores = np.asarray(likes, dtype=np.int64) + np.asarray(comments, dtype=np.int64) * 2
+            
+            # Normalizar engajamento com base nos seguidores (se disponível)
+            followers = np.asarray(followers, dtype=np.float64)
+            normalized_engagement = np.divide(
+                engagement_scores, np.sqrt(followers), out=np.zeros_like(followers), where=followers > 0
+            )
+            
+            relevance_scores = np.asarray(relevance_scores, dtype=np.float64)
+            
+            for post, total, normalized in zip(processed_posts, engagement_scores.tolist(), normalized_engagement.tolist()):
+                post["engagement"]["total_engagement"] = total
+                post["engagement"]["normalized_engagement"] = normalized
+            
+            # Ordenar por engajamento normalizado e relevância (ou selecionar apenas os K mais bem pontuados)
+            order = rank_indices(normalized_engagement * 0.7 + relevance_scores * 0.3, top_k)
+            processed_posts = [processed_posts[i] for i in order]
         
         logger.info(f"Processados {len(processed_posts)} posts do Instagram")
         return processed_posts
     
-    def __del__(self):
-        """Limpar recursos ao destruir o objeto."""
-        # Remover diretório temporário
-        if os.path.exists(self.temp_dir):
-            import shutil
-            shutil.rmtree(self.temp_dir, ignore_errors=True)
+    def close(self) -> None:
+        """Fecha as sessões do Instaloader e o cache em disco, e remove o diretório temporário."""
+        for loader in self._all_loaders:
+            loader.close()
+        self.cache.close()
+        self._temp_dir.cleanup()
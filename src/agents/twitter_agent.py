@@ -3,23 +3,106 @@ Agente para coleta de dados do Twitter usando a API.
 """
 
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import numpy as np
 import sys
 import os
-from pathlib import Path
-
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent.parent
-sys.path.append(str(project_root))
 
 from src.agents.base_agent import BaseAgent
-from src.utils.text_processor import TextProcessor
+from src.utils.ranking import rank_indices
+from src.utils.text_processor import TextProcessor, analyze_texts
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Cliente da API de dados, disponível apenas no ambiente de execução do sandbox
+SANDBOX_RUNTIME = '/opt/.manus/.sandbox-runtime'
+if SANDBOX_RUNTIME not in sys.path:
+    sys.path.append(SANDBOX_RUNTIME)
+
+try:
+    from data_api import ApiClient
+except ImportError:
+    ApiClient = None
+
+# Palavras-chave usadas no cálculo de relevância
+_RELEVANCE_KEYWORDS = ("política", "entretenimento", "notícias")
+
+# Valores padrão usados quando a configuração não os define
+_DEFAULT_SEARCH_TERMS = ("política", "entretenimento", "notícias")
+
+# Contadores de interação de um tweet e seus pesos no cálculo do engajamento
+_ENGAGEMENT_FIELDS = ("retweet_count", "favorite_count", "reply_count", "quote_count")
+_ENGAGEMENT_WEIGHTS = np.array([2.0, 1.0, 1.5, 1.5])
+
+def _iter_tweets(instructions: List[Dict[str, Any]], collected_at: datetime, user: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre as instruções de uma timeline da API, gerando os tweets encontrados.
+    
+    Resultados de busca agrupam os tweets em itens dentro de cada entrada e trazem o
+    autor de cada tweet; timelines de usuário têm um tweet por entrada e usam o autor informado.
+    
+    Args:
+        instructions: Instruções da timeline retornada pela API
+        collected_at: Data/hora da coleta
+        user: Autor dos tweets, para timelines de um usuário específico
+        
+    Returns:
+        Iterador sobre os tweets extraídos
+    """
+    for instruction in instructions:
+        for entry in instruction.get('entries', ()):
+            content = entry.get('content', {})
+            
+            # Verificar se é um tweet e localizar o conteúdo de cada item
+            if user is None:
+                if content.get('__typename') != 'TimelineTimelineItem':
+                    continue
+                item_contents = [item.get('item', {}).get('itemContent', {}) for item in content.get('items', ())]
+                type_key = '__typename'
+            else:
+                if content.get('entryType') != 'TimelineTimelineItem':
+                    continue
+                item_contents = [content.get('itemContent', {})]
+                type_key = 'itemType'
+            
+            for item_content in item_contents:
+                if item_content.get(type_key) != 'TimelineTweet':
+                    continue
+                
+                result = item_content.get('tweet_results', {}).get('result', {})
+                legacy = result.get('legacy', {})
+                
+                if user is None:
+                    # Extrair informações do usuário
+                    user_result = result.get('core', {}).get('user_results', {}).get('result', {})
+                    user_legacy = user_result.get('legacy', {})
+                    author = {
+                        'id': user_result.get('rest_id', ''),
+                        'name': user_legacy.get('name', ''),
+                        'screen_name': user_legacy.get('screen_name', ''),
+                        'followers_count': user_legacy.get('followers_count', 0),
+                        'verified': user_legacy.get('verified', False),
+                        'profile_image_url': user_legacy.get('profile_image_url_https', '')
+                    }
+                else:
+                    author = dict(user)
+                
+                yield {
+                    'id': result.get('rest_id', ''),
+                    'text': legacy.get('full_text', ''),
+                    'created_at': legacy.get('created_at', ''),
+                    'retweet_count': legacy.get('retweet_count', 0),
+                    'favorite_count': legacy.get('favorite_count', 0),
+                    'reply_count': legacy.get('reply_count', 0),
+                    'quote_count': legacy.get('quote_count', 0),
+                    'user': author,
+                    'source': 'Twitter',
+                    'collected_at': collected_at
+                }
+
 class TwitterAgent(BaseAgent):
     """Agente para coleta de dados do Twitter."""
     
@@ -31,13 +114,60 @@ class TwitterAgent(BaseAgent):
             config: Configurações do agente
         """
         super().__init__(config, "twitter")
-        self.search_terms = config.get("search_terms", ["política", "entretenimento", "notícias"])
+        self.search_terms = tuple(config.get("search_terms", _DEFAULT_SEARCH_TERMS))
         self.max_tweets = config.get("max_tweets", 50)
         self.result_type = config.get("result_type", "popular")
+        self.max_workers = config.get("max_workers", 8)
+        
+        # Cache persistente dos perfis resolvidos (nome de usuário -> dados do usuário)
+        self.cache = diskcache.Cache(config.get("cache_dir", "data/cache/twitter"))
+        self.user_cache_ttl = config.get("user_cache_ttl", 24 * 3600)
+        self.response_cache_ttl = config.get("response_cache_ttl", 15 * 60)
+        
+        # Cliente da API criado uma única vez e reaproveitado por todas as buscas
+        self._api_client = None
+        try:
+            if ApiClient is None:
+                raise ImportError("módulo data_api não encontrado")
+            self._api_client = ApiClient()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar o cliente da API do Twitter: {e}")
         self.text_processor = TextProcessor()
         
         logger.info(f"Agente Twitter inicializado com termos de busca: {self.search_terms}")
     
+    def _get_api_client(self):
+        """
+        Obtém o cliente da API compartilhado pelo agente.
+        
+        Returns:
+            Cliente da API
+        """
+        if self._api_client is None:
+            raise RuntimeError("Cliente da API do Twitter indisponível")
+        return self._api_client
+    
+    def _call_api(self, endpoint: str, query: Dict[str, Any]) -> Any:
+        """
+        Chama um endpoint da API, reaproveitando respostas recentes guardadas em disco.
+        
+        Args:
+            endpoint: Nome do endpoint
+            query: Parâmetros da consulta
+            
+        Returns:
+            Resposta da API
+        """
+        cache_key = ("response", endpoint, tuple(sorted(query.items())))
+        response = self.cache.get(cache_key)
+        if response is not None:
+            return response
+        
+        response = self._get_api_client().call_api(endpoint, query=query)
+        if response and 'result' in response:
+            self.cache.set(cache_key, response, expire=self.response_cache_ttl)
+        return response
+    
     def _search_twitter(self, query: str, count: int = 20) -> List[Dict[str, Any]]:
         """
         Realiza uma busca no Twitter usando a API.
@@ -50,76 +180,20 @@ class TwitterAgent(BaseAgent):
             Lista de tweets encontrados
         """
         try:
-            import sys
-            sys.path.append('/opt/.manus/.sandbox-runtime')
-            from data_api import ApiClient
-            client = ApiClient()
-            
             # Usar a API de busca do Twitter
-            search_results = client.call_api('Twitter/search_twitter', query={
+            search_results = self._call_api('Twitter/search_twitter', {
                 'query': query,
                 'count': count,
                 'type': self.result_type.capitalize()
             })
             
-            # Processar os resultados
-            tweets = []
-            
             if not search_results or 'result' not in search_results:
                 logger.warning(f"Nenhum resultado encontrado para a busca: {query}")
                 return []
             
             # Extrair tweets dos resultados
-            timeline = search_results.get('result', {}).get('timeline', {})
-            instructions = timeline.get('instructions', [])
-            
-            for instruction in instructions:
-                entries = instruction.get('entries', [])
-                
-                for entry in entries:
-                    content = entry.get('content', {})
-                    
-                    # Verificar se é um tweet
-                    if content.get('__typename') == 'TimelineTimelineItem':
-                        items = content.get('items', [])
-                        
-                        for item in items:
-                            item_content = item.get('item', {}).get('itemContent', {})
-                            
-                            # Extrair dados do tweet
-                            if item_content.get('__typename') == 'TimelineTweet':
-                                tweet_results = item_content.get('tweet_results', {})
-                                result = tweet_results.get('result', {})
-                                
-                                # Extrair informações do usuário
-                                user_results = result.get('core', {}).get('user_results', {})
-                                user_result = user_results.get('result', {})
-                                user_legacy = user_result.get('legacy', {})
-                                
-                                # Extrair conteúdo do tweet
-                                legacy = result.get('legacy', {})
-                                
-                                tweet = {
-                                    'id': result.get('rest_id', ''),
-                                    'text': legacy.get('full_text', ''),
-                                    'created_at': legacy.get('created_at', ''),
-                                    'retweet_count': legacy.get('retweet_count', 0),
-                                    'favorite_count': legacy.get('favorite_count', 0),
-                                    'reply_count': legacy.get('reply_count', 0),
-                                    'quote_count': legacy.get('quote_count', 0),
-                                    'user': {
-                                        'id': user_result.get('rest_id', ''),
-                                        'name': user_legacy.get('name', ''),
-                                        'screen_name': user_legacy.get('screen_name', ''),
-                                        'followers_count': user_legacy.get('followers_count', 0),
-                                        'verified': user_legacy.get('verified', False),
-                                        'profile_image_url': user_legacy.get('profile_image_url_https', '')
-                                    },
-                                    'source': 'Twitter',
-                                    'collected_at': datetime.now().isoformat()
-                                }
-                                
-                                tweets.append(tweet)
+            instructions = search_results['result'].get('timeline', {}).get('instructions', ())
+            tweets = list(_iter_tweets(instructions, datetime.now()))
             
             logger.info(f"Encontrados {len(tweets)} tweets para a busca: {query}")
             return tweets
@@ -140,22 +214,24 @@ class TwitterAgent(BaseAgent):
             Lista de tweets do usuário
         """
         try:
-            import sys
-            sys.path.append('/opt/.manus/.sandbox-runtime')
-            from data_api import ApiClient
-            client = ApiClient()
-            
-            # Primeiro, obter o ID do usuário
-            user_profile = client.call_api('Twitter/get_user_profile_by_username', query={
-                'username': username
-            })
+            # Primeiro, obter o ID do usuário (reaproveitando perfis já resolvidos)
+            cache_key = ("user", username)
+            user_data = self.cache.get(cache_key)
             
-            if not user_profile or 'result' not in user_profile:
-                logger.warning(f"Perfil não encontrado para o usuário: {username}")
-                return []
+            if user_data is None:
+                user_profile = self._call_api('Twitter/get_user_profile_by_username', {
+                    'username': username
+                })
+                
+                if not user_profile or 'result' not in user_profile:
+                    logger.warning(f"Perfil não encontrado para o usuário: {username}")
+                    return []
+                
+                # Extrair os dados do usuário
+                user_data = user_profile.get('result', {}).get('data', {}).get('user', {}).get('result', {})
+                if user_data.get('rest_id'):
+                    self.cache.set(cache_key, user_data, expire=self.user_cache_ttl)
             
-            # Extrair o ID do usuário
-            user_data = user_profile.get('result', {}).get('data', {}).get('user', {}).get('result', {})
             user_id = user_data.get('rest_id', '')
             
             if not user_id:
@@ -163,61 +239,29 @@ class TwitterAgent(BaseAgent):
                 return []
             
             # Obter tweets do usuário
-            user_tweets = client.call_api('Twitter/get_user_tweets', query={
+            user_tweets = self._call_api('Twitter/get_user_tweets', {
                 'user': user_id,
                 'count': count
             })
             
-            # Processar os resultados
-            tweets = []
-            
             if not user_tweets or 'result' not in user_tweets:
                 logger.warning(f"Nenhum tweet encontrado para o usuário: {username}")
                 return []
             
-            # Extrair tweets dos resultados
-            timeline = user_tweets.get('result', {}).get('timeline', {})
-            instructions = timeline.get('instructions', [])
+            # Dados do autor, comuns a todos os tweets
+            user_legacy = user_data.get('legacy', {})
+            user = {
+                'id': user_id,
+                'name': user_legacy.get('name', ''),
+                'screen_name': username,
+                'followers_count': user_legacy.get('followers_count', 0),
+                'verified': user_legacy.get('verified', False),
+                'profile_image_url': user_legacy.get('profile_image_url_https', '')
+            }
             
-            for instruction in instructions:
-                entries = instruction.get('entries', [])
-                
-                for entry in entries:
-                    content = entry.get('content', {})
-                    
-                    # Verificar se é um tweet
-                    if content.get('entryType') == 'TimelineTimelineItem':
-                        item_content = content.get('itemContent', {})
-                        
-                        # Extrair dados do tweet
-                        if item_content.get('itemType') == 'TimelineTweet':
-                            tweet_results = item_content.get('tweet_results', {})
-                            result = tweet_results.get('result', {})
-                            
-                            # Extrair conteúdo do tweet
-                            legacy = result.get('legacy', {})
-                            
-                            tweet = {
-                                'id': result.get('rest_id', ''),
-                                'text': legacy.get('full_text', ''),
-                                'created_at': legacy.get('created_at', ''),
-                                'retweet_count': legacy.get('retweet_count', 0),
-                                'favorite_count': legacy.get('favorite_count', 0),
-                                'reply_count': legacy.get('reply_count', 0),
-                                'quote_count': legacy.get('quote_count', 0),
-                                'user': {
-                                    'id': user_id,
-                                    'name': user_data.get('legacy', {}).get('name', ''),
-                                    'screen_name': username,
-                                    'followers_count': user_data.get('legacy', {}).get('followers_count', 0),
-                                    'verified': user_data.get('legacy', {}).get('verified', False),
-                                    'profile_image_url': user_data.get('legacy', {}).get('profile_image_url_https', '')
-                                },
-                                'source': 'Twitter',
-                                'collected_at': datetime.now().isoformat()
-                            }
-                            
-                            tweets.append(tweet)
+            # Extrair tweets dos resultados
+            instructions = user_tweets['result'].get('timeline', {}).get('instructions', ())
+            tweets = list(_iter_tweets(instructions, datetime.now(), user))
             
             logger.info(f"Encontrados {len(tweets)} tweets do usuário: {username}")
             return tweets
@@ -234,77 +278,76 @@ class TwitterAgent(BaseAgent):
             Lista de tweets coletados
         """
         all_tweets = []
+        seen_ids = set()
+        news_accounts = ["g1", "bbcbrasil", "cnnbrasil", "folha", "estadao"]
         
-        # Coletar tweets por termos de busca
-        for term in self.search_terms:
-            try:
+        # Buscar termos e perfis em paralelo, com número limitado de requisições simultâneas
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = []
+            
+            # Coletar tweets por termos de busca
+            for term in self.search_terms:
                 logger.info(f"Buscando tweets para o termo: {term}")
-                tweets = self._search_twitter(term, count=min(self.max_tweets // len(self.search_terms), 100))
-                all_tweets.extend(tweets)
-            except Exception as e:
-                logger.error(f"Erro ao buscar tweets para o termo {term}: {e}")
-        
-        # Coletar tweets de perfis de notícias relevantes
-        news_accounts = ["g1", "bbcbrasil", "cnnbrasil", "folha", "estadao"]
-        for account in news_accounts:
-            try:
+                futures.append((f"Erro ao buscar tweets para o termo {term}", executor.submit(
+                    self._search_twitter, term, count=min(self.max_tweets // len(self.search_terms), 100)
+                )))
+            
+            # Coletar tweets de perfis de notícias relevantes
+            for account in news_accounts:
                 logger.info(f"Coletando tweets do perfil: {account}")
-                tweets = self._get_user_tweets(account, count=10)
-                all_tweets.extend(tweets)
-            except Exception as e:
-                logger.error(f"Erro ao coletar tweets do perfil {account}: {e}")
-        
-        # Remover duplicatas (pelo ID do tweet)
-        unique_tweets = {tweet['id']: tweet for tweet in all_tweets if 'id' in tweet}
-        all_tweets = list(unique_tweets.values())
+                futures.append((f"Erro ao coletar tweets do perfil {account}", executor.submit(
+                    self._get_user_tweets, account, count=10
+                )))
+            
+            # Reunir os resultados na ordem de submissão, descartando duplicatas (pelo ID do tweet)
+            for error_message, future in futures:
+                try:
+                    tweets = future.result()
+                except Exception as e:
+                    logger.error(f"{error_message}: {e}")
+                    continue
+                
+                for tweet in tweets:
+                    tweet_id = tweet.get("id")
+                    if tweet_id and tweet_id not in seen_ids:
+                        seen_ids.add(tweet_id)
+                        all_tweets.append(tweet)
         
         logger.info(f"Total de {len(all_tweets)} tweets coletados")
         return all_tweets
     
-    def process_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def process_data(self, data: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Processa os dados coletados do Twitter.
         
         Args:
             data: Dados coletados
+            top_k: Número de tweets mais bem pontuados a manter (padrão: config "top_k"; None mantém todos)
             
         Returns:
             Dados processados
         """
+        if top_k is None:
+            top_k = self.config.get("top_k")
+        
         processed_tweets = []
+        processed_at = datetime.now()
+        
+        # Contadores, seguidores e relevância dos tweets processados (em paralelo à lista), usados no cálculo em lote após o loop
+        counts = []
+        followers = []
+        relevance_scores = []
         
-        for tweet in data:
+        # Limpar os textos, calcular relevância e extrair entidades (em vários processos se o volume justificar)
+        tweets = [tweet for tweet in data if tweet.get("text")]
+        analyses = analyze_texts([tweet["text"] for tweet in tweets], _RELEVANCE_KEYWORDS, self.text_processor)
+        
+        for tweet, analysis in zip(tweets, analyses):
+            if analysis is None:
+                continue
+            
             try:
-                # Verificar se o tweet tem conteúdo
-                if not tweet.get("text"):
-                    continue
-                
-                # Limpar o texto
-                cleaned_text = self.text_processor.clean_text(tweet.get("text", ""))
-                
-                # Calcular engajamento
-                engagement_score = (
-                    tweet.get("retweet_count", 0) * 2 + 
-                    tweet.get("favorite_count", 0) + 
-                    tweet.get("reply_count", 0) * 1.5 + 
-                    tweet.get("quote_count", 0) * 1.5
-                )
-                
-                # Normalizar engajamento com base nos seguidores (se disponível)
-                followers = tweet.get("user", {}).get("followers_count", 0)
-                if followers > 0:
-                    normalized_engagement = engagement_score / (followers ** 0.5)
-                else:
-                    normalized_engagement = 0
-                
-                # Calcular relevância
-                relevance_keywords = ["política", "entretenimento", "notícias"]
-                relevance_score = self.text_processor.calculate_relevance_score(
-                    cleaned_text, relevance_keywords
-                )
-                
-                # Extrair entidades
-                entities = self.text_processor.extract_entities(cleaned_text)
+                cleaned_text, relevance_score, entities, word_count = analysis
                 
                 # Criar tweet processado
                 processed_tweet = {
@@ -316,30 +359,46 @@ class TwitterAgent(BaseAgent):
                         "retweet_count": tweet.get("retweet_count", 0),
                         "favorite_count": tweet.get("favorite_count", 0),
                         "reply_count": tweet.get("reply_count", 0),
-                        "quote_count": tweet.get("quote_count", 0),
-                        "total_engagement": engagement_score,
-                        "normalized_engagement": normalized_engagement
+                        "quote_count": tweet.get("quote_count", 0)
                     },
                     "source": "Twitter",
                     "entities": entities,
                     "relevance_score": relevance_score,
-                    "word_count": len(cleaned_text.split()),
-                    "processed_at": datetime.now().isoformat()
+                    "word_count": word_count,
+                    "processed_at": processed_at
                 }
                 
+                counts.append([processed_tweet["engagement"][field] for field in _ENGAGEMENT_FIELDS])
+                followers.append(tweet.get("user", {}).get("followers_count", 0))
+                relevance_scores.append(relevance_score)
                 processed_tweets.append(processed_tweet)
             
             except Exception as e:
                 logger.error(f"Erro ao processar tweet: {e}")
         
-        # Ordenar por engajamento normalizado e relevância
-        processed_tweets.sort(
-            key=lambda x: (
-                x.get("engagement", {}).get("normalized_engagement", 0) * 0.7 + 
-                x.get("relevance_score", 0) * 0.3
-            ), 
-            reverse=True
-        )
+        if processed_tweets:
+            # Calcular engajamento
+            engagement_scores = np.asarray(counts, dtype=np.float64) @ _ENGAGEMENT_WEIGHTS
+            
+            # Normalizar engajamento com base nos seguidores (se disponível)
+            followers = np.asarray(followers, dtype=np.float64)
+            normalized_engagement = np.divide(
+                engagement_scores, np.sqrt(followers), out=np.zeros_like(followers), where=followers > 0
+            )
+            
+            relevance_scores = np.asarray(relevance_scores, dtype=np.float64)
+            
+            for tweet, total, normalized in zip(processed_tweets, engagement_scores.tolist(), normalized_engagement.tolist()):
+                tweet["engagement"]["total_engagement"] = total
+                tweet["engagement"]["normalized_engagement"] = normalized
+            
+            # Ordenar por engajamento normalizado e relevância (ou selecionar apenas os K mais bem pontuados)
+            order = rank_indices(normalized_engagement * 0.7 + relevance_scores * 0.3, top_k)
+            processed_tweets = [processed_tweets[i] for i in order]
         
         logger.info(f"Processados {len(processed_tweets)} tweets")
         return processed_tweets
+    
+    def close(self) -> None:
+        """Fecha o cache em disco."""
+        self.cache.close()
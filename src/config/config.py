@@ -1,23 +1,53 @@
 """
 Arquivo de configuração para o projeto de agentes de IA.
 Contém configurações para os modelos, APIs e parâmetros gerais.
+
+As configurações são somente leitura: listas viram tuplas e dicionários viram
+mapeamentos imutáveis (types.MappingProxyType), avaliados uma única vez na importação.
 """
 
+from types import MappingProxyType
+from typing import Any, Mapping
+
+def _freeze(value: Any) -> Any:
+    """
+    Converte recursivamente dicionários e listas em estruturas imutáveis.
+    
+    Args:
+        value: Valor de configuração
+        
+    Returns:
+        Valor equivalente somente leitura
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
 # Configurações do Ollama
-OLLAMA_CONFIG = {
+OLLAMA_CONFIG: Mapping[str, Any] = _freeze({
     "model": "gemma",  # Modelo padrão
     "host": "http://localhost",  # Host do Ollama
     "port": 11434,  # Porta padrão do Ollama
-    "timeout": 60,  # Timeout em segundos
-}
+    "timeout": 300,  # Timeout em segundos (uma matéria completa pode levar minutos em CPU)
+    "num_parallel": 4,  # Matérias geradas simultaneamente (o servidor deve aceitar OLLAMA_NUM_PARALLEL >= este valor)
+})
 
 # Configurações para os agentes de coleta
-AGENT_CONFIG = {
+AGENT_CONFIG: Mapping[str, Any] = _freeze({
     # Configurações para o agente do G1
     "g1": {
         "base_url": "https://g1.globo.com",
         "categories": ["politica", "economia", "entretenimento"],
         "max_articles": 10,
+        "cache_dir": "data/cache/g1",
+        "cache_ttl": 6 * 3600,  # Segundos até revalidar um artigo em cache
+        "max_workers": 8,  # Downloads simultâneos
+        "requests_per_second": 2.0,
+        "burst": 4,
+        "top_k": None,  # Manter apenas os K artigos mais relevantes (None = todos)
+        "save_raw": False,  # Salvar também os dados brutos (diagnóstico)
     },
     
     # Configurações para o agente do Twitter
@@ -25,6 +55,12 @@ AGENT_CONFIG = {
         "search_terms": ["política", "entretenimento", "notícias"],
         "max_tweets": 50,
         "result_type": "popular",
+        "max_workers": 8,  # Buscas simultâneas
+        "cache_dir": "data/cache/twitter",
+        "user_cache_ttl": 24 * 3600,  # Segundos até resolver novamente um perfil
+        "response_cache_ttl": 15 * 60,  # Segundos em que uma resposta da API é reaproveitada
+        "top_k": None,  # Manter apenas os K tweets mais bem pontuados (None = todos)
+        "save_raw": False,
     },
     
     # Configurações para o agente do Instagram
@@ -32,33 +68,52 @@ AGENT_CONFIG = {
         "profiles": ["g1", "bbcbrasil", "cnnbrasil"],
         "hashtags": ["noticia", "politica", "entretenimento"],
         "max_posts": 20,
+        "max_workers": 4,  # Perfis/hashtags simultâneos (o Instagram limita requisições agressivamente)
+        "requests_per_minute": 30,
+        "burst": 5,
+        "max_retries": 3,  # Tentativas por requisição (repetidas pelo próprio Instaloader)
+        "profile_cache_ttl": 600,  # Segundos em que um perfil consultado é reaproveitado
+        "cache_dir": "data/cache/instagram",
+        "profile_posts_ttl": 3600,  # Segundos em que os posts coletados de um perfil são reaproveitados
+        "hashtag_posts_ttl": 15 * 60,  # Idem, para hashtags
+        "top_k": None,  # Manter apenas os K posts mais bem pontuados (None = todos)
+        "save_raw": False,
     }
-}
+})
 
 # Configurações para processamento de dados
-PROCESSING_CONFIG = {
+PROCESSING_CONFIG: Mapping[str, Any] = _freeze({
     "min_relevance_score": 0.6,
     "max_content_length": 1000,
     "language": "pt-br",
-}
+    "parallel_min_items": 200,  # Itens a partir dos quais a análise de texto usa vários processos
+    "max_processes": None,  # Processos na análise paralela (None = número de CPUs)
+    "max_io_workers": 8,  # Threads na leitura paralela dos arquivos de dados
+})
 
 # Configurações para geração de matérias
-CONTENT_GENERATION_CONFIG = {
+CONTENT_GENERATION_CONFIG: Mapping[str, Any] = _freeze({
     "min_words": 500,
     "max_paragraphs": 5,
     "temperature": 0.7,
     "top_p": 0.9,
-}
+    "cache_dir": "data/cache/articles",  # Matérias já geradas, reaproveitadas entre execuções
+    "cache_ttl": 24 * 3600,  # Segundos em que uma matéria gerada (mesmo tópico e fatos) é reaproveitada
+    "embedding_model": "nomic-embed-text",  # Modelo do Ollama para buscar tópicos semelhantes (None = apenas cache exato)
+    "similarity_threshold": 0.92,  # Similaridade de cosseno mínima para reaproveitar uma matéria
+    "similarity_max_age": 6 * 3600,  # Idade máxima, em segundos, de uma matéria reaproveitada por similaridade
+    "max_cached_embeddings": 1000,  # Embeddings mais recentes carregados para a busca por similaridade
+})
 
 # Configurações para métricas e insights
-METRICS_CONFIG = {
+METRICS_CONFIG: Mapping[str, Any] = _freeze({
     "engagement_threshold": 0.5,
     "trending_threshold": 0.7,
     "sentiment_analysis": True,
-}
+})
 
 # Configurações de saída
-OUTPUT_CONFIG = {
+OUTPUT_CONFIG: Mapping[str, Any] = _freeze({
     "json_output_path": "data/processed/materias.json",
     "metrics_output_path": "data/processed/metricas.json",
-}
+})
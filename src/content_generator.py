@@ -3,25 +3,38 @@ Gerador de matérias em formato JSON a partir dos dados processados e insights.
 """
 
 import logging
-import json
-from typing import List, Dict, Any
-import os
-from pathlib import Path
-import sys
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import random
-
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
+import hashlib
+import unicodedata
+import threading
+import time
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+import diskcache
+import numpy as np
 
 from src.models.ollama_client import OllamaClient
 from src.config.config import OLLAMA_CONFIG, CONTENT_GENERATION_CONFIG
+from src.utils.fs import ensure_dir
+from src.utils.json_io import load_json, save_json
+from src.utils.consolidated_io import CONSOLIDATED_META_PATH, load_consolidated_data
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _normalize_topic(topic: str) -> str:
+    """
+    Normaliza um tópico para comparação (sem diferenças de caixa, acentuação composta ou espaços nas pontas).
+    
+    Args:
+        topic: Tópico
+        
+    Returns:
+        Tópico normalizado
+    """
+    return unicodedata.normalize("NFKD", topic).casefold().strip()
+
 class ContentGenerator:
     """Gerador de matérias em formato JSON a partir dos dados processados e insights."""
     
@@ -34,9 +47,24 @@ class ContentGenerator:
         
         # Inicializar cliente Ollama
         self.ollama_client = OllamaClient(OLLAMA_CONFIG)
+        self.num_parallel = OLLAMA_CONFIG.get("num_parallel", 4)
+        
+        # Cache das matérias geradas: busca exata por (tópico, fatos) e, se houver modelo de
+        # embeddings, por similaridade com os tópicos gerados recentemente
+        self.article_cache = diskcache.Cache(CONTENT_GENERATION_CONFIG.get("cache_dir", "data/cache/articles"))
+        self.cache_ttl = CONTENT_GENERATION_CONFIG.get("cache_ttl", 24 * 3600)
+        self.embedding_model = CONTENT_GENERATION_CONFIG.get("embedding_model")
+        self.similarity_threshold = CONTENT_GENERATION_CONFIG.get("similarity_threshold", 0.92)
+        self.similarity_max_age = CONTENT_GENERATION_CONFIG.get("similarity_max_age", 6 * 3600)
+        self._cache_lock = threading.Lock()
+        self._cached_keys = []
+        self._cached_embeddings = []
+        self._cached_times = []
+        if self.embedding_model:
+            self._load_cached_embeddings(CONTENT_GENERATION_CONFIG.get("max_cached_embeddings", 1000))
         
         # Criar diretório para saída
-        os.makedirs("data/processed", exist_ok=True)
+        ensure_dir("data/processed")
         
         logger.info("Gerador de conteúdo inicializado")
     
@@ -50,8 +78,7 @@ class ContentGenerator:
         file_path = "data/processed/insights.json"
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_json(file_path)
             
             logger.info(f"Insights carregados de {file_path}")
             return data
@@ -59,25 +86,174 @@ class ContentGenerator:
             logger.error(f"Erro ao carregar insights: {e}")
             return {}
     
-    def load_consolidated_data(self) -> Dict[str, Any]:
+    def load_consolidated_data(self, topics: Optional[List[str]] = None) -> Dict[str, Any]:
         """
         Carrega os dados consolidados.
         
+        Args:
+            topics: Tópicos cujos itens devem ser carregados (None carrega todos)
+            
         Returns:
             Dados consolidados
         """
-        file_path = "data/processed/consolidated_data.json"
-        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_consolidated_data(topics)
             
-            logger.info(f"Dados consolidados carregados de {file_path}")
+            logger.info(f"Dados consolidados carregados de {CONSOLIDATED_META_PATH}")
             return data
         except Exception as e:
             logger.error(f"Erro ao carregar dados consolidados: {e}")
             return {}
     
+    def close(self) -> None:
+        """Fecha o cliente Ollama e o cache de matérias."""
+        self.ollama_client.close()
+        self.article_cache.close()
+    
+    def __enter__(self):
+        """Permite usar o gerador em um bloco with, liberando os recursos ao final."""
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        """Libera os recursos ao sair do bloco with."""
+        self.close()
+    
+    @staticmethod
+    def _cache_key(topic: str, facts: List[str]) -> str:
+        """
+        Calcula a chave do cache de matérias para um tópico e seus fatos (independente da ordem dos fatos).
+        
+        Args:
+            topic: Tópico da matéria
+            facts: Fatos relevantes sobre o tópico
+            
+        Returns:
+            Chave do cache
+        """
+        text = topic + "\x00" + "\n".join(sorted(facts))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def _embed_topic(self, topic: str, facts: List[str]) -> Optional[np.ndarray]:
+        """
+        Calcula o embedding normalizado de um tópico (com seu primeiro fato).
+        
+        Args:
+            topic: Tópico da matéria
+            facts: Fatos relevantes sobre o tópico
+            
+        Returns:
+            Vetor normalizado, ou None se não houver modelo de embeddings ou em caso de erro
+        """
+        model = self.embedding_model
+        if not model:
+            return None
+        
+        try:
+            embedding = self.ollama_client.embed(f"{topic} {facts[0]}" if facts else topic, model)
+        except Exception as e:
+            self._disable_embeddings(model, e)
+            return None
+        if embedding is None:
+            return None
+        
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def _disable_embeddings(self, model: str, error: Exception) -> None:
+        """
+        Desativa a busca por similaridade nesta execução, avisando uma única vez.
+        
+        Args:
+            model: Modelo de embeddings que falhou
+            error: Erro retornado pelo Ollama
+        """
+        with self._cache_lock:
+            if self.embedding_model is None:
+                return
+            self.embedding_model = None
+        
+        logger.warning(f"Busca por matérias semelhantes desativada: falha ao usar o modelo de embeddings {model} "
+                       f"({error}). Baixe-o com 'ollama pull {model}'; o cache exato continua ativo.")
+    
+    def _load_cached_embeddings(self, max_count: int) -> None:
+        """
+        Carrega os embeddings das matérias em cache recentes o bastante para a busca por similaridade.
+        
+        Args:
+            max_count: Número máximo de embeddings carregados (os mais recentes)
+        """
+        # Descartar as matérias vencidas antes de percorrer o cache
+        self.article_cache.expire()
+        
+        min_time = time.time() - self.similarity_max_age
+        recent = []
+        for key in self.article_cache:
+            entry = self.article_cache.get(key)
+            if entry and entry.get("embedding") is not None and entry.get("stored_at", 0) >= min_time:
+                recent.append((entry["stored_at"], key, entry["embedding"]))
+        
+        for stored_at, key, embedding in heapq.nlargest(max_count, recent, key=lambda item: item[0]):
+            self._cached_keys.append(key)
+            self._cached_embeddings.append(embedding)
+            self._cached_times.append(stored_at)
+    
+    def _find_similar_article(self, embedding: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Procura no cache a matéria recente cujo tópico é mais semelhante ao informado.
+        
+        Args:
+            embedding: Embedding normalizado do tópico
+            
+        Returns:
+            Matéria em cache, se a similaridade atingir o limiar e a matéria não for antiga demais
+        """
+        # Considerar apenas embeddings do mesmo modelo (mesma dimensão) e matérias recentes
+        min_time = time.time() - self.similarity_max_age
+        with self._cache_lock:
+            candidates = [
+                (key, cached) for key, cached, stored_at in zip(self._cached_keys, self._cached_embeddings, self._cached_times)
+                if len(cached) == len(embedding) and stored_at >= min_time
+            ]
+        
+        if not candidates:
+            return None
+        
+        keys = [key for key, _ in candidates]
+        matrix = np.asarray([cached for _, cached in candidates], dtype=np.float32)
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        
+        entry = self.article_cache.get(keys[best])
+        if not entry or entry.get("stored_at", 0) < min_time:
+            return None
+        return entry["article"]
+    
+    def _store_article(self, key: str, embedding: Optional[np.ndarray], article_data: Dict[str, Any]) -> None:
+        """
+        Guarda uma matéria gerada no cache.
+        
+        Args:
+            key: Chave do cache
+            embedding: Embedding normalizado do tópico (opcional)
+            article_data: Matéria gerada
+        """
+        stored_embedding = embedding.tolist() if embedding is not None else None
+        stored_at = time.time()
+        self.article_cache.set(
+            key,
+            {"article": article_data, "embedding": stored_embedding, "stored_at": stored_at},
+            expire=self.cache_ttl
+        )
+        
+        if stored_embedding is not None:
+            with self._cache_lock:
+                self._cached_keys.append(key)
+                self._cached_embeddings.append(stored_embedding)
+                self._cached_times.append(stored_at)
+    
     def generate_article(self, topic: str, facts: List[str], editoria: str = None) -> Dict[str, Any]:
         """
         Gera uma matéria sobre um tópico.
@@ -91,6 +267,24 @@ class ContentGenerator:
             Matéria gerada em formato JSON
         """
         try:
+            # Reaproveitar uma matéria já gerada para o mesmo tópico e fatos, ou para um tópico semelhante
+            # (entradas sem data de criação são anteriores à expiração do cache e não são reaproveitadas)
+            key = self._cache_key(topic, facts)
+            entry = self.article_cache.get(key)
+            cached_article = entry["article"] if entry and "stored_at" in entry else None
+            
+            embedding = None
+            if cached_article is None:
+                embedding = self._embed_topic(topic, facts)
+                if embedding is not None:
+                    cached_article = self._find_similar_article(embedding)
+            
+            if cached_article is not None:
+                article_data = dict(cached_article)
+                article_data["generated_at"] = datetime.now()
+                logger.info(f"Matéria sobre o tópico '{topic}' reaproveitada do cache")
+                return article_data
+            
             # Determinar editoria se não fornecida
             if not editoria:
                 editorias = ["Política", "Economia", "Entretenimento", "Tecnologia", "Esportes", "Saúde", "Educação", "Mundo"]
@@ -109,7 +303,11 @@ class ContentGenerator:
                 article_data["editoria"] = editoria
             
             # Adicionar metadados
-            article_data["generated_at"] = datetime.now().isoformat()
+            article_data["generated_at"] = datetime.now()
+            
+            # Guardar no cache apenas matérias com conteúdo (falhas do modelo retornam texto vazio)
+            if article_data.get("materia"):
+                self._store_article(key, embedding, article_data)
             
             logger.info(f"Matéria gerada sobre o tópico '{topic}'")
             return article_data
@@ -122,20 +320,36 @@ class ContentGenerator:
                 "subtitulo": "Falha no processamento",
                 "editoria": editoria or "Geral",
                 "keywords": [topic, "erro", "falha"],
-                "generated_at": datetime.now().isoformat()
+                "generated_at": datetime.now()
             }
     
-    def generate_articles_from_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _generate_articles(self, jobs: List[Tuple[str, List[str]]]) -> List[Dict[str, Any]]:
         """
-        Gera matérias a partir das recomendações.
+        Gera várias matérias concorrentemente (as chamadas ao Ollama apenas aguardam o servidor).
+        
+        Args:
+            jobs: Pares (tópico, fatos) das matérias a gerar
+            
+        Returns:
+            Matérias geradas, na mesma ordem dos pares
+        """
+        if len(jobs) <= 1 or self.num_parallel <= 1:
+            return [self.generate_article(topic, facts) for topic, facts in jobs]
+        
+        with ThreadPoolExecutor(max_workers=min(self.num_parallel, len(jobs))) as executor:
+            return list(executor.map(lambda job: self.generate_article(*job), jobs))
+    
+    def _recommendation_jobs(self, recommendations: List[Dict[str, Any]]) -> List[Tuple[str, List[str]]]:
+        """
+        Seleciona as recomendações que viram matérias.
         
         Args:
             recommendations: Lista de recomendações de conteúdo
             
         Returns:
-            Lista de matérias geradas
+            Pares (tópico, fatos) das matérias a gerar
         """
-        articles = []
+        jobs = []
         
         for recommendation in recommendations:
             topic = recommendation.get("topic", "")
@@ -144,38 +358,64 @@ class ContentGenerator:
             
             # Gerar apenas para recomendações de alta prioridade ou algumas de média prioridade
             if priority == "Alta" or (priority == "Média" and random.random() > 0.5):
-                article = self.generate_article(topic, facts)
-                articles.append(article)
+                jobs.append((topic, facts))
         
-        logger.info(f"Geradas {len(articles)} matérias a partir das recomendações")
-        return articles
+        return jobs
     
-    def generate_articles_from_trending_topics(self, topic_insights: List[Dict[str, Any]], max_articles: int = 5) -> List[Dict[str, Any]]:
+    def _trending_jobs(self, topic_insights: List[Dict[str, Any]], max_topics: Optional[int] = None) -> List[Tuple[str, List[str]]]:
         """
-        Gera matérias a partir dos tópicos em tendência.
+        Seleciona os tópicos em tendência (com fatos) que viram matérias, do mais ao menos em alta.
         
         Args:
             topic_insights: Lista de insights sobre tópicos
-            max_articles: Número máximo de artigos a gerar
+            max_topics: Número máximo de tópicos considerados (None considera todos)
             
         Returns:
-            Lista de matérias geradas
+            Pares (tópico, fatos) das matérias a gerar
         """
-        articles = []
-        
         # Ordenar tópicos por pontuação de tendência
         sorted_topics = sorted(topic_insights, key=lambda x: x.get("trend_score", 0), reverse=True)
         
         # Limitar número de tópicos
-        top_topics = sorted_topics[:max_articles]
+        top_topics = sorted_topics[:max_topics]
         
+        jobs = []
         for topic_insight in top_topics:
             topic = topic_insight.get("topic", "")
             facts = topic_insight.get("key_facts", [])
             
             if facts:
-                article = self.generate_article(topic, facts)
-                articles.append(article)
+                jobs.append((topic, facts))
+        
+        return jobs
+    
+    def generate_articles_from_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Gera matérias a partir das recomendações.
+        
+        Args:
+            recommendations: Lista de recomendações de conteúdo
+            
+        Returns:
+            Lista de matérias geradas
+        """
+        articles = self._generate_articles(self._recommendation_jobs(recommendations))
+        
+        logger.info(f"Geradas {len(articles)} matérias a partir das recomendações")
+        return articles
+    
+    def generate_articles_from_trending_topics(self, topic_insights: List[Dict[str, Any]], max_articles: int = 5) -> List[Dict[str, Any]]:
+        """
+        Gera matérias a partir dos tópicos em tendência.
+        
+        Args:
+            topic_insights: Lista de insights sobre tópicos
+            max_articles: Número máximo de artigos a gerar
+            
+        Returns:
+            Lista de matérias geradas
+        """
+        articles = self._generate_articles(self._trending_jobs(topic_insights, max_topics=max_articles))
         
         logger.info(f"Geradas {len(articles)} matérias a partir dos tópicos em tendência")
         return articles
@@ -201,31 +441,38 @@ class ContentGenerator:
         recommendations = insights.get("content_recommendations", [])
         topic_insights = insights.get("topic_insights", [])
         
-        # Gerar matérias a partir das recomendações
-        recommendation_articles = self.generate_articles_from_recommendations(recommendations)
+        # Reunir as matérias a gerar: primeiro as recomendações, completadas pelos tópicos em tendência,
+        # sem repetir tópicos (a primeira ocorrência prevalece) e limitadas ao número máximo
+        jobs = {}
+        for topic, facts in self._recommendation_jobs(recommendations) + self._trending_jobs(topic_insights):
+            jobs.setdefault(_normalize_topic(topic), (topic, facts))
+        jobs = list(jobs.values())[:max_articles]
         
-        # Se não atingiu o número máximo, gerar mais matérias a partir dos tópicos em tendência
-        remaining_articles = max_articles - len(recommendation_articles)
-        
-        if remaining_articles > 0:
-            trending_articles = self.generate_articles_from_trending_topics(topic_insights, max_articles=remaining_articles)
-            recommendation_articles.extend(trending_articles)
-        
-        # Limitar ao número máximo
-        all_articles = recommendation_articles[:max_articles]
+        # Descartar matérias repetidas (tópicos diferentes podem reaproveitar a mesma matéria do cache)
+        all_articles = []
+        seen_texts = set()
+        for article in self._generate_articles(jobs):
+            text = article.get("materia")
+            if text in seen_texts:
+                continue
+            if text:
+                seen_texts.add(text)
+            all_articles.append(article)
         
         # Salvar matérias
         output_path = "data/processed/materias.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_articles, f, ensure_ascii=False, indent=2)
+        save_json(all_articles, output_path)
         
         logger.info(f"Todas as matérias ({len(all_articles)}) salvas em {output_path}")
         return all_articles
 
 if __name__ == "__main__":
+    # Configurar logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     logger.info("Iniciando geração de matérias...")
-    generator = ContentGenerator()
-    articles = generator.generate_all_articles()
+    with ContentGenerator() as generator:
+        articles = generator.generate_all_articles()
     
     if articles:
         logger.info("Geração de matérias concluída com sucesso")
@@ -4,27 +4,101 @@ Responsável por analisar, filtrar e consolidar os dados para geração de insig
 """
 
 import logging
-import json
-from typing import List, Dict, Any, Tuple
-import os
+import re
+from typing import List, Dict, Any, Tuple, Callable, Iterable, Set
 from pathlib import Path
 import sys
 from datetime import datetime
-import pandas as pd
+import numpy as np
 import nltk
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
-
-from src.utils.text_processor import TextProcessor
+from src.utils.text_processor import TextProcessor, load_sentence_tokenizer
 from src.config.config import PROCESSING_CONFIG
+from src.utils.fs import ensure_dir
+from src.utils.engagement import engagement_array
+from src.utils.json_io import iter_jsonl, load_json
+from src.utils.consolidated_io import CONSOLIDATED_META_PATH, CONSOLIDATED_TOPICS_PATH, save_consolidated_data
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Número máximo de fatos-chave extraídos por tópico
+MAX_KEY_FACTS = 10
+
+def _topic_matcher(topics_lower: Iterable[str]) -> Callable[[str], Set[str]]:
+    """
+    Cria uma função que encontra, em uma única varredura do texto, quais tópicos ele contém.
+    
+    A expressão testa, em cada posição do texto, o tópico mais longo que começa ali; os tópicos
+    contidos nele (ex.: "lula" em "lula da silva") são acrescentados em seguida, de modo que o
+    resultado é o mesmo de testar `tópico in texto` para cada tópico.
+    
+    Args:
+        topics_lower: Tópicos, em minúsculas
+        
+    Returns:
+        Função que recebe um texto em minúsculas e retorna os tópicos encontrados
+    """
+    alternatives = sorted(set(topics_lower), key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))")
+    contained = {topic: [other for other in alternatives if other in topic] for topic in alternatives}
+    
+    def find_topics(text: str) -> Set[str]:
+        return {topic for match in set(pattern.findall(text)) for topic in contained[match]}
+    
+    return find_topics
+
+def _intern_tags(item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Interna as entidades, hashtags e a fonte de um item, para que valores repetidos entre
+    itens compartilhem o mesmo objeto (menos memória e comparações por identidade nas contagens).
+    
+    Args:
+        item: Item carregado
+        
+    Returns:
+        O próprio item
+    """
+    for field in ("entities", "hashtags"):
+        values = item.get(field)
+        if values:
+            item[field] = [sys.intern(value) if isinstance(value, str) else value for value in values]
+    
+    source = item.get("source")
+    if isinstance(source, str):
+        item["source"] = sys.intern(source)
+    
+    return item
+
+# Campo de texto de cada fonte, para ler o conteúdo com uma única consulta ao dicionário
+_CONTENT_FIELD_BY_SOURCE = {
+    "G1": "content",
+    "Twitter": "text",
+    "Instagram": "caption",
+}
+
+def _item_content(item: Dict[str, Any]) -> str:
+    """
+    Obtém o texto de um item, conforme a fonte (conteúdo do G1, texto do tweet ou legenda do Instagram).
+    
+    Args:
+        item: Item coletado
+        
+    Returns:
+        Texto do item
+    """
+    field = _CONTENT_FIELD_BY_SOURCE.get(item.get("source"))
+    if field is not None and field in item:
+        return item[field] or ""
+    
+    # Fonte desconhecida: procurar o primeiro campo de texto presente
+    for field in ("content", "text", "caption"):
+        if field in item:
+            return item[field] or ""
+    return ""
+
 class DataProcessor:
     """Processador de dados coletados pelos agentes."""
     
@@ -34,15 +108,20 @@ class DataProcessor:
         self.min_relevance_score = PROCESSING_CONFIG.get("min_relevance_score", 0.6)
         self.max_content_length = PROCESSING_CONFIG.get("max_content_length", 1000)
         self.language = PROCESSING_CONFIG.get("language", "pt-br")
+        self.max_io_workers = PROCESSING_CONFIG.get("max_io_workers", 8)
+        
+        # Segmentador de sentenças carregado uma única vez (recorre ao nltk.sent_tokenize se indisponível)
+        sentence_tokenizer = load_sentence_tokenizer(self.language)
+        self.sent_tokenize = sentence_tokenizer.tokenize if sentence_tokenizer else nltk.sent_tokenize
         
         # Criar diretório para dados processados
-        os.makedirs("data/processed", exist_ok=True)
+        ensure_dir("data/processed")
         
         logger.info("Processador de dados inicializado")
     
     def load_data(self, file_path: str) -> List[Dict[str, Any]]:
         """
-        Carrega dados de um arquivo JSON.
+        Carrega dados de um arquivo JSON ou JSONL.
         
         Args:
             file_path: Caminho do arquivo
@@ -51,8 +130,13 @@ class DataProcessor:
             Dados carregados
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if str(file_path).endswith(".jsonl"):
+                data = list(iter_jsonl(file_path))
+            else:
+                data = load_json(file_path)
+            
+            for item in data:
+                _intern_tags(item)
             
             logger.info(f"Dados carregados de {file_path}: {len(data)} itens")
             return data
@@ -60,6 +144,54 @@ class DataProcessor:
             logger.error(f"Erro ao carregar dados de {file_path}: {e}")
             return []
     
+    def _load_relevant_file(self, file_path: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Carrega os itens de um arquivo, mantendo apenas os que atingem a relevância mínima.
+        
+        Args:
+            file_path: Caminho do arquivo
+            
+        Returns:
+            Tupla (itens relevantes, total de itens lidos)
+        """
+        relevant_data = []
+        loaded = 0
+        try:
+            items = iter_jsonl(file_path) if str(file_path).endswith(".jsonl") else load_json(file_path)
+            for item in items:
+                loaded += 1
+                if item.get("relevance_score", 0) >= self.min_relevance_score:
+                    relevant_data.append(_intern_tags(item))
+            logger.info(f"Dados carregados de {file_path}: {loaded} itens")
+        except Exception as e:
+            logger.error(f"Erro ao carregar dados de {file_path}: {e}")
+        return relevant_data, loaded
+    
+    def load_relevant_data(self, data_files: List[str]) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Carrega os itens de vários arquivos, mantendo apenas os que atingem a relevância mínima.
+        
+        Arquivos JSONL são lidos item a item, de modo que os itens descartados nunca ficam todos na memória.
+        Vários arquivos são lidos em paralelo, para sobrepor a espera pelo disco; a ordem dos itens é preservada.
+        
+        Args:
+            data_files: Lista de caminhos de arquivos
+            
+        Returns:
+            Tupla (itens relevantes, total de itens lidos)
+        """
+        if len(data_files) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.max_io_workers, len(data_files))) as executor:
+                results = list(executor.map(self._load_relevant_file, data_files))
+        else:
+            results = [self._load_relevant_file(file_path) for file_path in data_files]
+        
+        relevant_data = list(chain.from_iterable(relevant for relevant, _ in results))
+        total_items = sum(loaded for _, loaded in results)
+        
+        logger.info(f"Filtrados {len(relevant_data)} itens por relevância (de {total_items})")
+        return relevant_data, total_items
+    
     def filter_by_relevance(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Filtra os dados por relevância.
@@ -92,28 +224,12 @@ class DataProcessor:
         if not data:
             return []
         
-        # Extrair valores de engajamento
-        engagement_values = []
-        for item in data:
-            engagement = item.get("engagement", {})
-            if isinstance(engagement, dict) and "normalized_engagement" in engagement:
-                engagement_values.append(engagement["normalized_engagement"])
-            elif isinstance(engagement, dict) and "total_engagement" in engagement:
-                engagement_values.append(engagement["total_engagement"])
-            else:
-                engagement_values.append(0)
-        
-        # Calcular limiar de engajamento
-        if engagement_values:
-            threshold = pd.Series(engagement_values).quantile(min_percentile)
-        else:
-            threshold = 0
+        # Extrair valores de engajamento e calcular o limiar
+        engagement_values = engagement_array(data)
+        threshold = float(np.quantile(engagement_values, min_percentile))
         
         # Filtrar por engajamento
-        filtered_data = []
-        for i, item in enumerate(data):
-            if engagement_values[i] >= threshold:
-                filtered_data.append(item)
+        filtered_data = [data[i] for i in np.flatnonzero(engagement_values >= threshold).tolist()]
         
         logger.info(f"Filtrados {len(filtered_data)} itens por engajamento (de {len(data)})")
         return filtered_data
@@ -128,33 +244,26 @@ class DataProcessor:
         Returns:
             Dados agrupados por tópico
         """
-        # Extrair entidades e palavras-chave de todos os itens
-        all_entities = []
-        for item in data:
-            entities = item.get("entities", [])
-            if entities:
-                all_entities.extend(entities)
-        
         # Contar frequência das entidades
-        entity_counter = Counter(all_entities)
+        item_entities = [item.get("entities") or () for item in data]
+        entity_counter = Counter(chain.from_iterable(item_entities))
         top_entities = [entity for entity, count in entity_counter.most_common(10) if count > 1]
         
-        # Agrupar por tópico (usando entidades como tópicos)
-        topics = {}
-        for entity in top_entities:
-            topics[entity] = []
-            for item in data:
-                item_entities = item.get("entities", [])
-                if entity in item_entities:
-                    topics[entity].append(item)
-        
-        # Adicionar grupo "outros" para itens não classificados
-        classified_items = set()
-        for topic_items in topics.values():
-            for item in topic_items:
-                classified_items.add(id(item))
-        
-        topics["outros"] = [item for item in data if id(item) not in classified_items]
+        # Agrupar por tópico (usando entidades como tópicos) em uma única passagem pelos itens;
+        # itens sem nenhuma das entidades principais vão para o grupo "outros"
+        topics = {entity: [] for entity in top_entities}
+        others = []
+        for item, entities in zip(data, item_entities):
+            matched = False
+            for entity in dict.fromkeys(entities):
+                topic_items = topics.get(entity)
+                if topic_items is not None:
+                    topic_items.append(item)
+                    matched = True
+            if not matched:
+                others.append(item)
+        
+        topics["outros"] = others
         
         logger.info(f"Dados agrupados em {len(topics)} tópicos")
         return topics
@@ -170,59 +279,53 @@ class DataProcessor:
         Returns:
             Lista de tópicos em tendência
         """
-        # Extrair todas as entidades e hashtags
-        all_entities = []
-        all_hashtags = []
-        
-        for item in data:
-            # Entidades
-            entities = item.get("entities", [])
-            if entities:
-                all_entities.extend(entities)
-            
-            # Hashtags (para dados do Twitter e Instagram)
-            hashtags = item.get("hashtags", [])
-            if hashtags:
-                all_hashtags.extend(hashtags)
-        
-        # Contar frequência
-        entity_counter = Counter(all_entities)
-        hashtag_counter = Counter(all_hashtags)
+        # Codificar entidades e hashtags como inteiros (entidades primeiro, na ordem em que aparecem,
+        # para que empates sigam a mesma ordem de Counter.most_common sobre entidades + hashtags)
+        tag_ids = {}
+        item_entity_ids = [[tag_ids.setdefault(tag, len(tag_ids)) for tag in item.get("entities") or ()] for item in data]
+        item_hashtag_ids = [[tag_ids.setdefault(tag, len(tag_ids)) for tag in item.get("hashtags") or ()] for item in data]
+        
+        if not tag_ids:
+            logger.info("Extraídos 0 tópicos em tendência")
+            return []
         
-        # Combinar entidades e hashtags
-        combined_counter = entity_counter + hashtag_counter
+        # Pares (item, tópico) distintos: cada item conta uma vez por tópico relacionado
+        pair_items = []
+        pair_tags = []
+        for index, (entity_ids, hashtag_ids) in enumerate(zip(item_entity_ids, item_hashtag_ids)):
+            for tag_id in dict.fromkeys(entity_ids + hashtag_ids):
+                pair_items.append(index)
+                pair_tags.append(tag_id)
+        pair_items = np.asarray(pair_items, dtype=np.int64)
+        pair_tags = np.asarray(pair_tags, dtype=np.int64)
+        
+        # Frequência de cada tópico (todas as ocorrências) e soma do engajamento dos itens relacionados
+        occurrences = np.fromiter(
+            chain(chain.from_iterable(item_entity_ids), chain.from_iterable(item_hashtag_ids)), dtype=np.int64
+        )
+        counts = np.bincount(occurrences, minlength=len(tag_ids))
+        related_counts = np.bincount(pair_tags, minlength=len(tag_ids))
+        engagement_values = engagement_array(data)
+        engagement_sums = np.bincount(pair_tags, weights=engagement_values[pair_items], minlength=len(tag_ids))
+        
+        # Índice tópico -> itens relacionados (CSR): itens agrupados por tópico, na ordem original
+        items_by_tag = pair_items[np.argsort(pair_tags, kind="stable")]
+        tag_starts = np.concatenate(([0], np.cumsum(related_counts)))
+        
+        # Selecionar os tópicos mais frequentes e decodificar apenas esses
+        top_ids = np.argsort(-counts, kind="stable")[:top_n].tolist()
+        tags = list(tag_ids)
         
         # Extrair tópicos em tendência
         trending_topics = []
-        for topic, count in combined_counter.most_common(top_n):
-            # Encontrar itens relacionados a este tópico
-            related_items = []
-            for item in data:
-                entities = item.get("entities", [])
-                hashtags = item.get("hashtags", [])
-                
-                if topic in entities or topic in hashtags:
-                    related_items.append(item)
-            
-            # Calcular engajamento médio
-            avg_engagement = 0
-            if related_items:
-                engagement_sum = 0
-                for item in related_items:
-                    engagement = item.get("engagement", {})
-                    if isinstance(engagement, dict):
-                        if "normalized_engagement" in engagement:
-                            engagement_sum += engagement["normalized_engagement"]
-                        elif "total_engagement" in engagement:
-                            engagement_sum += engagement["total_engagement"]
-                
-                avg_engagement = engagement_sum / len(related_items)
+        for tag_id in top_ids:
+            related_items = [data[i] for i in items_by_tag[tag_starts[tag_id]:tag_starts[tag_id + 1]].tolist()]
             
             trending_topics.append({
-                "topic": topic,
-                "count": count,
-                "avg_engagement": avg_engagement,
-                "sources": list(set(item.get("source", "") for item in related_items)),
+                "topic": tags[tag_id],
+                "count": int(counts[tag_id]),
+                "avg_engagement": float(engagement_sums[tag_id] / related_counts[tag_id]),
+                "sources": list(dict.fromkeys(item.get("source", "") for item in related_items)),
                 "related_items_count": len(related_items)
             })
         
@@ -240,50 +343,63 @@ class DataProcessor:
         Returns:
             Lista de fatos-chave
         """
-        # Filtrar itens relacionados ao tópico
-        related_items = []
+        return self.extract_key_facts_by_topic(data, [topic])[topic]
+    
+    def extract_key_facts_by_topic(self, data: List[Dict[str, Any]], topics: List[str]) -> Dict[str, List[str]]:
+        """
+        Extrai fatos-chave sobre vários tópicos, segmentando o conteúdo de cada item em sentenças uma única vez.
+        
+        Args:
+            data: Dados para extração de fatos
+            topics: Tópicos para extração de fatos
+            
+        Returns:
+            Fatos-chave de cada tópico
+        """
+        # Sentenças de cada tópico, sem duplicatas e na ordem em que aparecem
+        sentences_by_topic = {topic: {} for topic in topics}
+        if not sentences_by_topic:
+            return {}
+        
+        topics_by_lower = {}
+        for topic in sentences_by_topic:
+            topics_by_lower.setdefault(topic.lower(), []).append(topic)
+        find_topics = _topic_matcher(topics_by_lower)
+        
+        # Tópicos que ainda não atingiram o limite de fatos; a varredura termina quando todos atingem
+        pending_topics = len(sentences_by_topic)
+        
         for item in data:
-            entities = item.get("entities", [])
-            hashtags = item.get("hashtags", [])
+            content = _item_content(item)
             
-            content = ""
-            if "content" in item:
-                content = item["content"]
-            elif "text" in item:
-                content = item["text"]
-            elif "caption" in item:
-                content = item["caption"]
+            # Toda sentença que menciona um tópico está em um conteúdo que o menciona,
+            # então itens sem nenhuma menção não precisam ser segmentados
+            if not content or not find_topics(content.lower()):
+                continue
             
-            if topic in entities or topic in hashtags or topic.lower() in content.lower():
-                related_items.append(item)
-        
-        # Extrair sentenças relevantes
-        sentences = []
-        for item in related_items:
-            content = ""
-            if "content" in item:
-                content = item["content"]
-            elif "text" in item:
-                content = item["text"]
-            elif "caption" in item:
-                content = item["caption"]
+            # Extrair sentenças relevantes, ignorando as muito curtas
+            for sentence in self.sent_tokenize(content):
+                if len(sentence.split()) <= 5:
+                    continue
+                for topic_lower in find_topics(sentence.lower()):
+                    for topic in topics_by_lower[topic_lower]:
+                        sentences = sentences_by_topic[topic]
+                        if len(sentences) < MAX_KEY_FACTS and sentence not in sentences:
+                            sentences[sentence] = None
+                            if len(sentences) == MAX_KEY_FACTS:
+                                pending_topics -= 1
+            
+            if not pending_topics:
+                break
+        
+        key_facts_by_topic = {}
+        for topic, sentences in sentences_by_topic.items():
+            key_facts = list(sentences)
+            key_facts_by_topic[topic] = key_facts
             
-            if content:
-                item_sentences = nltk.sent_tokenize(content)
-                for sentence in item_sentences:
-                    if topic.lower() in sentence.lower():
-                        sentences.append(sentence)
-        
-        # Remover duplicatas e sentenças muito curtas
-        unique_sentences = list(set(sentences))
-        filtered_sentences = [s for s in unique_sentences if len(s.split()) > 5]
-        
-        # Limitar número de fatos
-        max_facts = min(len(filtered_sentences), 10)
-        key_facts = filtered_sentences[:max_facts]
-        
-        logger.info(f"Extraídos {len(key_facts)} fatos-chave sobre o tópico '{topic}'")
-        return key_facts
+            logger.info(f"Extraídos {len(key_facts)} fatos-chave sobre o tópico '{topic}'")
+        
+        return key_facts_by_topic
     
     def consolidate_data(self, data_files: List[str]) -> Dict[str, Any]:
         """
@@ -295,14 +411,8 @@ class DataProcessor:
         Returns:
             Dados consolidados
         """
-        all_data = []
-        
-        for file_path in data_files:
-            data = self.load_data(file_path)
-            all_data.extend(data)
-        
-        # Filtrar por relevância
-        filtered_data = self.filter_by_relevance(all_data)
+        # Carregar os itens filtrando por relevância durante a leitura
+        filtered_data, total_items = self.load_relevant_data(data_files)
         
         # Filtrar por engajamento
         filtered_data = self.filter_by_engagement(filtered_data)
@@ -314,26 +424,25 @@ class DataProcessor:
         trending_topics = self.extract_trending_topics(filtered_data)
         
         # Extrair fatos-chave para cada tópico em tendência
+        key_facts_by_topic = self.extract_key_facts_by_topic(
+            filtered_data, [topic["topic"] for topic in trending_topics]
+        )
         for topic in trending_topics:
-            topic_name = topic["topic"]
-            key_facts = self.extract_key_facts(filtered_data, topic_name)
-            topic["key_facts"] = key_facts
+            topic["key_facts"] = key_facts_by_topic[topic["topic"]]
         
         # Consolidar resultados
         consolidated_data = {
-            "total_items": len(all_data),
+            "total_items": total_items,
             "filtered_items": len(filtered_data),
             "topics": grouped_data,
             "trending_topics": trending_topics,
-            "processed_at": datetime.now().isoformat()
+            "processed_at": datetime.now()
         }
         
         # Salvar dados consolidados
-        output_path = "data/processed/consolidated_data.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(consolidated_data, f, ensure_ascii=False, indent=2)
+        save_consolidated_data(consolidated_data)
         
-        logger.info(f"Dados consolidados salvos em {output_path}")
+        logger.info(f"Dados consolidados salvos em {CONSOLIDATED_META_PATH} e {CONSOLIDATED_TOPICS_PATH}")
         return consolidated_data
     
     def process_all_data(self) -> Dict[str, Any]:
@@ -349,7 +458,7 @@ class DataProcessor:
         
         for source_dir in data_dir.iterdir():
             if source_dir.is_dir():
-                for file in source_dir.glob("*_processed.json"):
+                for file in source_dir.glob("*_processed.jsonl"):
                     data_files.append(str(file))
         
         if not data_files:
@@ -360,6 +469,9 @@ class DataProcessor:
         return self.consolidate_data(data_files)
 
 if __name__ == "__main__":
+    # Configurar logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     logger.info("Iniciando processamento de dados...")
     processor = DataProcessor()
     processed_data = processor.process_all_data()
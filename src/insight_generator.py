@@ -3,27 +3,69 @@ Gerador de insights e métricas a partir dos dados processados.
 """
 
 import logging
-import json
-from typing import List, Dict, Any
-import os
-from pathlib import Path
-import sys
+from typing import List, Dict, Any, Optional
 from datetime import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import functools
+from collections import Counter
+from itertools import chain
 import numpy as np
 
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
-
 from src.config.config import METRICS_CONFIG
+from src.utils.fs import ensure_dir
+from src.utils.engagement import engagement_array
+from src.utils.json_io import save_json
+from src.utils.ranking import rank_indices
+from src.utils.consolidated_io import CONSOLIDATED_META_PATH, load_consolidated_data
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Status de tendência, pelo número de limiares superados pela pontuação
+_TREND_STATUSES = ("Baixa", "Média", "Alta")
+
+@functools.lru_cache(maxsize=1)
+def _plotting():
+    """
+    Importa matplotlib e seaborn apenas quando uma visualização é gerada.
+    
+    Os gráficos usam a API orientada a objetos (Figure), renderizada pelo backend Agg,
+    sem passar pelo gerenciador de figuras global do pyplot.
+    
+    Returns:
+        Tupla (matplotlib.figure.Figure, matplotlib.colormaps, seaborn)
+    """
+    from matplotlib import colormaps
+    from matplotlib.figure import Figure
+    import seaborn as sns
+    return Figure, colormaps, sns
+
+def _all_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Reúne os itens de todos os tópicos dos dados consolidados.
+    
+    Args:
+        data: Dados consolidados
+        
+    Returns:
+        Itens de todos os tópicos
+    """
+    return list(chain.from_iterable(data.get("topics", {}).values()))
+
+def _trend_scores(trending_topics: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Calcula a pontuação de tendência de cada tópico (60% menções, 40% engajamento médio).
+    
+    Args:
+        trending_topics: Tópicos em tendência
+        
+    Returns:
+        Pontuação de cada tópico, na ordem dos tópicos
+    """
+    return np.fromiter(
+        (topic.get("count", 0) * 0.6 + topic.get("avg_engagement", 0) * 0.4 for topic in trending_topics),
+        dtype=np.float64,
+        count=len(trending_topics)
+    )
+
 class InsightGenerator:
     """Gerador de insights e métricas a partir dos dados processados."""
     
@@ -31,12 +73,13 @@ class InsightGenerator:
         """Inicializa o gerador de insights."""
         self.engagement_threshold = METRICS_CONFIG.get("engagement_threshold", 0.5)
         self.trending_threshold = METRICS_CONFIG.get("trending_threshold", 0.7)
+        self._trend_bins = np.array([self.trending_threshold / 2, self.trending_threshold])
         self.sentiment_analysis = METRICS_CONFIG.get("sentiment_analysis", True)
         
         # Criar diretórios para saída
-        os.makedirs("data/processed", exist_ok=True)
-        os.makedirs("data/processed/insights", exist_ok=True)
-        os.makedirs("data/processed/visualizations", exist_ok=True)
+        ensure_dir("data/processed")
+        ensure_dir("data/processed/insights")
+        ensure_dir("data/processed/visualizations")
         
         logger.info("Gerador de insights inicializado")
     
@@ -47,40 +90,32 @@ class InsightGenerator:
         Returns:
             Dados consolidados
         """
-        file_path = "data/processed/consolidated_data.json"
-        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = load_consolidated_data()
             
-            logger.info(f"Dados consolidados carregados de {file_path}")
+            logger.info(f"Dados consolidados carregados de {CONSOLIDATED_META_PATH}")
             return data
         except Exception as e:
             logger.error(f"Erro ao carregar dados consolidados: {e}")
             return {}
     
-    def generate_source_distribution(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_source_distribution(self, data: Dict[str, Any], all_items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Gera distribuição de fontes.
         
         Args:
             data: Dados consolidados
+            all_items: Itens de todos os tópicos, se já extraídos de data
             
         Returns:
             Distribuição de fontes
         """
-        # Extrair todos os itens
-        all_items = []
-        for topic_items in data.get("topics", {}).values():
-            all_items.extend(topic_items)
+        # Extrair todos os itens, se não foram informados
+        if all_items is None:
+            all_items = _all_items(data)
         
         # Contar itens por fonte
-        source_counts = {}
-        for item in all_items:
-            source = item.get("source", "Desconhecido")
-            if source not in source_counts:
-                source_counts[source] = 0
-            source_counts[source] += 1
+        source_counts = Counter(item.get("source", "Desconhecido") for item in all_items)
         
         # Calcular percentuais
         total_items = len(all_items)
@@ -94,210 +129,185 @@ class InsightGenerator:
         
         # Criar visualização
         if source_counts:
-            plt.figure(figsize=(10, 6))
-            sns.barplot(x=list(source_counts.keys()), y=list(source_counts.values()))
-            plt.title("Distribuição de Conteúdo por Fonte")
-            plt.xlabel("Fonte")
-            plt.ylabel("Quantidade de Itens")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig("data/processed/visualizations/source_distribution.png")
-            plt.close()
+            Figure, _, sns = _plotting()
+            fig = Figure(figsize=(10, 6))
+            ax = fig.subplots()
+            sns.barplot(x=list(source_counts.keys()), y=list(source_counts.values()), ax=ax)
+            ax.set_title("Distribuição de Conteúdo por Fonte")
+            ax.set_xlabel("Fonte")
+            ax.set_ylabel("Quantidade de Itens")
+            ax.tick_params(axis="x", labelrotation=45)
+            fig.tight_layout()
+            fig.savefig("data/processed/visualizations/source_distribution.png")
         
         logger.info(f"Distribuição de fontes gerada: {len(source_distribution)} fontes")
         return source_distribution
     
-    def generate_topic_insights(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def generate_topic_insights(self, data: Dict[str, Any], trend_scores: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Gera insights sobre os tópicos.
         
         Args:
             data: Dados consolidados
+            trend_scores: Pontuação de tendência de cada tópico em tendência, se já calculada
             
         Returns:
             Lista de insights sobre tópicos
         """
         trending_topics = data.get("trending_topics", [])
         
+        # Calcular a pontuação de tendência de todos os tópicos, se não foi informada
+        if trend_scores is None:
+            trend_scores = _trend_scores(trending_topics)
+        
+        # Determinar o status de tendência de todos os tópicos em uma chamada: o índice é o número de
+        # limiares estritamente menores que a pontuação (0 = Baixa, 1 = Média, 2 = Alta)
+        status_indices = np.searchsorted(self._trend_bins, trend_scores, side="left")
+        
+        # Criar os insights já em ordem decrescente de pontuação de tendência
         topic_insights = []
-        for topic in trending_topics:
+        for i in rank_indices(trend_scores):
+            topic = trending_topics[i]
             topic_name = topic.get("topic", "")
             count = topic.get("count", 0)
             avg_engagement = topic.get("avg_engagement", 0)
-            sources = topic.get("sources", [])
-            key_facts = topic.get("key_facts", [])
-            
-            # Calcular pontuação de tendência
-            trend_score = (count * 0.6) + (avg_engagement * 0.4)
-            
-            # Determinar status de tendência
-            if trend_score > self.trending_threshold:
-                trend_status = "Alta"
-            elif trend_score > self.trending_threshold / 2:
-                trend_status = "Média"
-            else:
-                trend_status = "Baixa"
+            trend_status = _TREND_STATUSES[status_indices[i]]
             
-            # Criar insight
-            insight = {
+            topic_insights.append({
                 "topic": topic_name,
                 "mentions": count,
                 "engagement": avg_engagement,
-                "trend_score": trend_score,
+                "trend_score": float(trend_scores[i]),
                 "trend_status": trend_status,
-                "sources": sources,
-                "key_facts": key_facts,
+                "sources": topic.get("sources", []),
+                "key_facts": topic.get("key_facts", []),
                 "summary": f"O tópico '{topic_name}' apresenta tendência {trend_status.lower()} com {count} menções e engajamento médio de {avg_engagement:.2f}."
-            }
-            
-            topic_insights.append(insight)
-        
-        # Ordenar por pontuação de tendência
-        topic_insights.sort(key=lambda x: x.get("trend_score", 0), reverse=True)
+            })
         
         # Criar visualização de tópicos em tendência
         if topic_insights:
             topics = [insight["topic"] for insight in topic_insights[:10]]
             scores = [insight["trend_score"] for insight in topic_insights[:10]]
             
-            plt.figure(figsize=(12, 6))
-            bars = plt.barh(topics, scores, color=plt.cm.viridis(np.linspace(0, 1, len(topics))))
-            plt.title("Tópicos em Tendência")
-            plt.xlabel("Pontuação de Tendência")
-            plt.tight_layout()
-            plt.savefig("data/processed/visualizations/trending_topics.png")
-            plt.close()
+            Figure, colormaps, _ = _plotting()
+            fig = Figure(figsize=(12, 6))
+            ax = fig.subplots()
+            ax.barh(topics, scores, color=colormaps["viridis"](np.linspace(0, 1, len(topics))))
+            ax.set_title("Tópicos em Tendência")
+            ax.set_xlabel("Pontuação de Tendência")
+            fig.tight_layout()
+            fig.savefig("data/processed/visualizations/trending_topics.png")
         
         logger.info(f"Insights de tópicos gerados: {len(topic_insights)} tópicos")
         return topic_insights
     
-    def generate_engagement_metrics(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_engagement_metrics(self, data: Dict[str, Any], all_items: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Gera métricas de engajamento.
         
         Args:
             data: Dados consolidados
+            all_items: Itens de todos os tópicos, se já extraídos de data
             
         Returns:
             Métricas de engajamento
         """
-        # Extrair todos os itens
-        all_items = []
-        for topic_items in data.get("topics", {}).values():
-            all_items.extend(topic_items)
-        
-        # Extrair métricas de engajamento por fonte
-        engagement_by_source = {}
-        
-        for item in all_items:
-            source = item.get("source", "Desconhecido")
-            
-            if source not in engagement_by_source:
-                engagement_by_source[source] = {
-                    "total_items": 0,
-                    "total_engagement": 0,
-                    "avg_engagement": 0,
-                    "high_engagement_items": 0
-                }
-            
-            engagement_by_source[source]["total_items"] += 1
-            
-            # Extrair engajamento
-            engagement = item.get("engagement", {})
-            engagement_value = 0
-            
-            if isinstance(engagement, dict):
-                if "normalized_engagement" in engagement:
-                    engagement_value = engagement["normalized_engagement"]
-                elif "total_engagement" in engagement:
-                    engagement_value = engagement["total_engagement"]
-            
-            engagement_by_source[source]["total_engagement"] += engagement_value
-            
-            # Contar itens de alto engajamento
-            if engagement_value > self.engagement_threshold:
-                engagement_by_source[source]["high_engagement_items"] += 1
-        
-        # Calcular médias
-        for source, metrics in engagement_by_source.items():
-            if metrics["total_items"] > 0:
-                metrics["avg_engagement"] = metrics["total_engagement"] / metrics["total_items"]
-                metrics["high_engagement_percentage"] = (metrics["high_engagement_items"] / metrics["total_items"]) * 100
-            else:
-                metrics["avg_engagement"] = 0
-                metrics["high_engagement_percentage"] = 0
+        # Extrair todos os itens, se não foram informados
+        if all_items is None:
+            all_items = _all_items(data)
+        
+        # Codificar a fonte de cada item como um inteiro (na ordem de primeira ocorrência)
+        source_codes = {}
+        codes = np.fromiter(
+            (source_codes.setdefault(item.get("source", "Desconhecido"), len(source_codes)) for item in all_items),
+            dtype=np.intp,
+            count=len(all_items)
+        )
+        
+        # Engajamento de cada item (normalizado, se disponível, ou total)
+        engagement_values = engagement_array(all_items)
+        
+        # Agregar por fonte: quantidade, engajamento total e itens de alto engajamento
+        num_sources = len(source_codes)
+        total_items = np.bincount(codes, minlength=num_sources)
+        total_engagement = np.bincount(codes, weights=engagement_values, minlength=num_sources)
+        high_engagement_items = np.bincount(codes[engagement_values > self.engagement_threshold], minlength=num_sources)
+        
+        engagement_by_source = {
+            source: {
+                "total_items": int(total_items[code]),
+                "total_engagement": float(total_engagement[code]),
+                "avg_engagement": float(total_engagement[code] / total_items[code]),
+                "high_engagement_items": int(high_engagement_items[code]),
+                "high_engagement_percentage": float(high_engagement_items[code] / total_items[code] * 100),
+            }
+            for source, code in source_codes.items()
+        }
         
         # Criar visualização de engajamento por fonte
         if engagement_by_source:
             sources = list(engagement_by_source.keys())
             avg_engagements = [metrics["avg_engagement"] for metrics in engagement_by_source.values()]
             
-            plt.figure(figsize=(12, 6))
-            bars = plt.bar(sources, avg_engagements, color=plt.cm.cool(np.linspace(0, 1, len(sources))))
-            plt.title("Engajamento Médio por Fonte")
-            plt.xlabel("Fonte")
-            plt.ylabel("Engajamento Médio")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            plt.savefig("data/processed/visualizations/engagement_by_source.png")
-            plt.close()
+            Figure, colormaps, _ = _plotting()
+            fig = Figure(figsize=(12, 6))
+            ax = fig.subplots()
+            ax.bar(sources, avg_engagements, color=colormaps["cool"](np.linspace(0, 1, len(sources))))
+            ax.set_title("Engajamento Médio por Fonte")
+            ax.set_xlabel("Fonte")
+            ax.set_ylabel("Engajamento Médio")
+            ax.tick_params(axis="x", labelrotation=45)
+            fig.tight_layout()
+            fig.savefig("data/processed/visualizations/engagement_by_source.png")
         
         logger.info(f"Métricas de engajamento geradas para {len(engagement_by_source)} fontes")
         return engagement_by_source
     
-    def generate_content_recommendations(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def generate_content_recommendations(self, data: Dict[str, Any], trend_scores: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Gera recomendações de conteúdo.
         
         Args:
             data: Dados consolidados
+            trend_scores: Pontuação de tendência de cada tópico em tendência, se já calculada
             
         Returns:
             Lista de recomendações de conteúdo
         """
         trending_topics = data.get("trending_topics", [])
+        high_threshold = self.trending_threshold
+        medium_threshold = high_threshold / 2
+        if trend_scores is None:
+            trend_scores = _trend_scores(trending_topics)
         
-        # Filtrar tópicos com alta tendência
-        high_trend_topics = [
-            topic for topic in trending_topics 
-            if (topic.get("count", 0) * 0.6 + topic.get("avg_engagement", 0) * 0.4) > self.trending_threshold
-        ]
-        
+        # Classificar os tópicos em uma única passada; as recomendações de tendência média vêm depois das de alta
         recommendations = []
-        for topic in high_trend_topics:
-            topic_name = topic.get("topic", "")
-            key_facts = topic.get("key_facts", [])
+        medium_recommendations = []
+        for topic, trend_score in zip(trending_topics, trend_scores.tolist()):
+            if trend_score <= medium_threshold:
+                continue
             
-            # Criar recomendação
-            recommendation = {
-                "topic": topic_name,
-                "key_facts": key_facts,
-                "recommendation": f"Criar matéria sobre '{topic_name}' com base nos fatos coletados.",
-                "priority": "Alta" if len(key_facts) >= 3 else "Média"
-            }
-            
-            recommendations.append(recommendation)
-        
-        # Adicionar recomendações para tópicos com tendência média
-        medium_trend_topics = [
-            topic for topic in trending_topics 
-            if (topic.get("count", 0) * 0.6 + topic.get("avg_engagement", 0) * 0.4) > self.trending_threshold / 2
-            and (topic.get("count", 0) * 0.6 + topic.get("avg_engagement", 0) * 0.4) <= self.trending_threshold
-        ]
-        
-        for topic in medium_trend_topics:
             topic_name = topic.get("topic", "")
             key_facts = topic.get("key_facts", [])
             
-            if len(key_facts) >= 2:
-                recommendation = {
+            if trend_score > high_threshold:
+                # Tópico com alta tendência
+                recommendations.append({
+                    "topic": topic_name,
+                    "key_facts": key_facts,
+                    "recommendation": f"Criar matéria sobre '{topic_name}' com base nos fatos coletados.",
+                    "priority": "Alta" if len(key_facts) >= 3 else "Média"
+                })
+            elif len(key_facts) >= 2:
+                # Tópico com tendência média
+                medium_recommendations.append({
                     "topic": topic_name,
                     "key_facts": key_facts,
                     "recommendation": f"Considerar matéria sobre '{topic_name}' se houver desenvolvimento adicional.",
                     "priority": "Média"
-                }
-                
-                recommendations.append(recommendation)
+                })
+        
+        recommendations.extend(medium_recommendations)
         
         logger.info(f"Recomendações de conteúdo geradas: {len(recommendations)} recomendações")
         return recommendations
@@ -316,11 +326,14 @@ class InsightGenerator:
             logger.error("Não foi possível carregar os dados consolidados")
             return {}
         
-        # Gerar insights e métricas
-        source_distribution = self.generate_source_distribution(data)
-        topic_insights = self.generate_topic_insights(data)
-        engagement_metrics = self.generate_engagement_metrics(data)
-        content_recommendations = self.generate_content_recommendations(data)
+        # Gerar insights e métricas (os itens de todos os tópicos e a pontuação de tendência
+        # de cada tópico são calculados uma única vez e compartilhados entre as etapas)
+        all_items = _all_items(data)
+        trend_scores = _trend_scores(data.get("trending_topics", []))
+        source_distribution = self.generate_source_distribution(data, all_items)
+        topic_insights = self.generate_topic_insights(data, trend_scores)
+        engagement_metrics = self.generate_engagement_metrics(data, all_items)
+        content_recommendations = self.generate_content_recommendations(data, trend_scores)
         
         # Consolidar insights
         all_insights = {
@@ -328,18 +341,20 @@ class InsightGenerator:
             "topic_insights": topic_insights,
             "engagement_metrics": engagement_metrics,
             "content_recommendations": content_recommendations,
-            "generated_at": datetime.now().isoformat()
+            "generated_at": datetime.now()
         }
         
         # Salvar insights
         output_path = "data/processed/insights.json"
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_insights, f, ensure_ascii=False, indent=2)
+        save_json(all_insights, output_path)
         
         logger.info(f"Todos os insights e métricas salvos em {output_path}")
         return all_insights
 
 if __name__ == "__main__":
+    # Configurar logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
     logger.info("Iniciando geração de insights...")
     generator = InsightGenerator()
     insights = generator.generate_all_insights()
@@ -3,14 +3,39 @@ Cliente para interação com o Ollama.
 Fornece métodos para carregar modelos e gerar conteúdo.
 """
 
+import re
+import time
+import httpx
 import ollama
 import logging
 from typing import Dict, Any, Optional, List
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Instruções fixas para a geração de matérias, enviadas como mensagem de sistema
+ARTICLE_SYSTEM_PROMPT = """Você é um redator que cria matérias jornalísticas completas a partir de um tópico e de fatos importantes.
+
+Regras:
+- Seja objetivo, até {max_paragraphs} parágrafos
+- Mínimo de {min_words} palavras
+- Não use aspas
+- Crie título, subtítulo, editoria e exatamente 5 palavras-chave
+- Use foco no fato principal
+
+Formato de saída:
+Título: [título da matéria]
+Subtítulo: [subtítulo da matéria]
+Editoria: [editoria da matéria]
+Palavras-chave: [5 palavras-chave separadas por vírgula]
+
+[Corpo da matéria com {max_paragraphs} parágrafos]"""
+
+# Tempo (em segundos) durante o qual a lista de modelos disponíveis é reaproveitada
+_MODELS_CACHE_TTL = 60
+
+# Linhas de cabeçalho da matéria gerada ("Campo: valor", aceitando marcações markdown como "**Título:**" ou "## Título:")
+_ARTICLE_HEADER_RE = re.compile(r'[\s*#]*(Título|Subtítulo|Editoria|Palavras-chave)\**:\**(.*)')
+
 class OllamaClient:
     """Cliente para interação com modelos do Ollama."""
     
@@ -26,11 +51,33 @@ class OllamaClient:
         self.port = config.get("port", 11434)
         self.timeout = config.get("timeout", 60)
         
-        # Configurar o cliente Ollama
-        ollama.host = f"{self.host}:{self.port}"
+        # Cliente HTTP persistente: as conexões (keep-alive) são reaproveitadas entre as chamadas,
+        # inclusive pelas gerações simultâneas, que usam até num_parallel conexões
+        num_parallel = config.get("num_parallel", 4)
+        self._client = ollama.Client(
+            host=f"{self.host}:{self.port}",
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=max(num_parallel, 1) * 2, max_keepalive_connections=max(num_parallel, 1)),
+        )
+        
+        # Última lista de modelos obtida e o instante (monotônico) em que foi obtida
+        self._models_cache = None
+        self._models_cached_at = 0.0
         
         logger.info(f"Cliente Ollama inicializado com modelo {self.model}")
     
+    def close(self) -> None:
+        """
+        Fecha as conexões com o servidor Ollama.
+        
+        O ollama.Client não expõe um método para isso nem aceita um cliente HTTP externo, então o
+        cliente httpx interno é fechado apenas se existir (atributo privado, que pode mudar entre versões).
+        """
+        http_client = getattr(self._client, "_client", None)
+        close = getattr(http_client, "close", None)
+        if close is not None:
+            close()
+    
     def change_model(self, model_name: str) -> None:
         """
         Altera o modelo utilizado.
@@ -45,16 +92,28 @@ class OllamaClient:
         """
         Lista os modelos disponíveis no Ollama.
         
+        A lista raramente muda durante a execução, então é reaproveitada por _MODELS_CACHE_TTL
+        segundos (falhas não são memorizadas).
+        
         Returns:
             Lista de nomes dos modelos disponíveis
         """
+        if self._models_cache is not None and time.monotonic() - self._models_cached_at < _MODELS_CACHE_TTL:
+            return list(self._models_cache)
+        
         try:
-            models = ollama.list()
-            return [model['name'] for model in models.get('models', [])]
+            models = self._client.list()
+            self._models_cache = [model['name'] for model in models.get('models', [])]
+            self._models_cached_at = time.monotonic()
+            return list(self._models_cache)
         except Exception as e:
             logger.error(f"Erro ao listar modelos: {e}")
             return []
     
+    def invalidate_models_cache(self) -> None:
+        """Descarta a lista de modelos memorizada (ex.: após baixar um novo modelo)."""
+        self._models_cache = None
+    
     def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
         """
         Gera texto usando o modelo atual.
@@ -68,7 +127,7 @@ class OllamaClient:
             Texto gerado pelo modelo
         """
         try:
-            response = ollama.generate(
+            response = self._client.generate(
                 model=self.model,
                 prompt=prompt,
                 options={
@@ -81,6 +140,24 @@ class OllamaClient:
             logger.error(f"Erro na geração de texto: {e}")
             return ""
     
+    def embed(self, text: str, model: str) -> Optional[List[float]]:
+        """
+        Calcula o embedding de um texto.
+        
+        Args:
+            text: Texto de entrada
+            model: Modelo de embeddings (ex.: nomic-embed-text)
+            
+        Returns:
+            Vetor de embedding, ou None se a resposta vier vazia
+            
+        Raises:
+            Exception: Se o Ollama não puder calcular o embedding (ex.: modelo não baixado); cabe ao
+                chamador decidir se desativa o recurso
+        """
+        response = self._client.embeddings(model=model, prompt=text)
+        return response.get('embedding') or None
+    
     def analyze_content(self, content: str, instruction: str) -> str:
         """
         Analisa conteúdo com base em uma instrução específica.
@@ -108,8 +185,41 @@ class OllamaClient:
         """
         prompt = f"Extraia exatamente {num_keywords} palavras-chave relevantes do seguinte texto, retornando apenas as palavras separadas por vírgula, sem explicações adicionais:\n\n{content}"
         response = self.generate(prompt)
-        keywords = [kw.strip() for kw in response.split(',')]
-        return keywords[:num_keywords]  # Garantir que temos exatamente o número solicitado
+        keywords = [kw.strip() for kw in response.split(',') if kw.strip()]
+        return keywords[:num_keywords]  # Garantir no máximo o número solicitado
+    
+    def chat(self, system: str, prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
+        """
+        Gera texto usando o modelo atual, com instruções de sistema separadas do pedido.
+        
+        Manter as instruções fixas na mensagem de sistema faz com que todas as requisições
+        compartilhem o mesmo prefixo, cujo processamento o Ollama reaproveita entre elas (cache KV).
+        
+        Args:
+            system: Instruções de sistema (fixas entre requisições)
+            prompt: Pedido específico desta requisição
+            temperature: Temperatura para geração (criatividade)
+            max_tokens: Número máximo de tokens a serem gerados
+            
+        Returns:
+            Texto gerado pelo modelo
+        """
+        try:
+            response = self._client.chat(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": prompt},
+                ],
+                options={
+                    "temperature": temperature,
+                    "num_predict": max_tokens,
+                }
+            )
+            return response['message']['content'] or ''
+        except Exception as e:
+            logger.error(f"Erro na geração de texto: {e}")
+            return ""
     
     def generate_article(self, 
                         topic: str, 
@@ -119,6 +229,8 @@ class OllamaClient:
         """
         Gera uma matéria completa com base em um tópico e fatos.
         
+        Título, subtítulo, editoria, palavras-chave e corpo são pedidos em uma única geração.
+        
         Args:
             topic: Tópico principal da matéria
             facts: Lista de fatos relevantes para a matéria
@@ -130,54 +242,42 @@ class OllamaClient:
         """
         facts_text = "\n".join([f"- {fact}" for fact in facts])
         
-        prompt = f"""
-        Crie uma matéria jornalística completa sobre o seguinte tópico: {topic}
+        system = ARTICLE_SYSTEM_PROMPT.format(min_words=min_words, max_paragraphs=max_paragraphs)
+        prompt = f"""Tópico: {topic}
+
+Fatos importantes:
+{facts_text}"""
         
-        Fatos importantes:
-        {facts_text}
+        response = self.chat(system, prompt, temperature=0.7, max_tokens=2000)
         
-        Regras:
-        - Seja objetivo, até {max_paragraphs} parágrafos
-        - Mínimo de {min_words} palavras
-        - Não use aspas
-        - Crie título, subtítulo e editoria
-        - Use foco no fato principal
+        # Processar a resposta para extrair as partes
+        headers = {}
+        body_lines = []
         
-        Formato de saída:
-        Título: [título da matéria]
-        Subtítulo: [subtítulo da matéria]
-        Editoria: [editoria da matéria]
+        for line in response.strip().split('\n'):
+            match = _ARTICLE_HEADER_RE.match(line)
+            if match:
+                headers[match.group(1)] = match.group(2).strip(" \t*")
+            elif headers and line.strip():  # Ignorar qualquer texto antes do cabeçalho
+                body_lines.append(line)
         
-        [Corpo da matéria com {max_paragraphs} parágrafos]
-        """
+        titulo = headers.get("Título", "")
+        subtitulo = headers.get("Subtítulo", "")
+        editoria = headers.get("Editoria", "")
+        keywords = [kw.strip() for kw in headers.get("Palavras-chave", "").split(',') if kw.strip()]
         
-        response = self.generate(prompt, temperature=0.7, max_tokens=2000)
+        # Sem nenhum cabeçalho reconhecido, toda a resposta é tratada como corpo da matéria
+        corpo = "\n".join(body_lines) if headers else response.strip()
         
-        # Processar a resposta para extrair as partes
-        lines = response.strip().split('\n')
-        
-        titulo = ""
-        subtitulo = ""
-        editoria = ""
-        corpo = ""
-        
-        for i, line in enumerate(lines):
-            if line.startswith("Título:"):
-                titulo = line.replace("Título:", "").strip()
-            elif line.startswith("Subtítulo:"):
-                subtitulo = line.replace("Subtítulo:", "").strip()
-            elif line.startswith("Editoria:"):
-                editoria = line.replace("Editoria:", "").strip()
-            elif i > 3 and line.strip():  # Assumindo que as 3 primeiras linhas são título, subtítulo e editoria
-                corpo += line + "\n"
-        
-        # Extrair palavras-chave do corpo da matéria
-        keywords = self.extract_keywords(corpo)
+        # Extrair palavras-chave do corpo da matéria (ou, se ele ficou vazio, da resposta inteira)
+        # quando o modelo não as informou
+        if not keywords:
+            keywords = self.extract_keywords(corpo or response)
         
         return {
             "materia": corpo.strip(),
             "titulo": titulo,
             "subtitulo": subtitulo,
             "editoria": editoria,
-            "keywords": keywords
+            "keywords": keywords[:5]
         }
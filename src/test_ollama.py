@@ -5,11 +5,6 @@ Script principal para testar a conexão com o Ollama.
 import sys
 import os
 import logging
-from pathlib import Path
-
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent.parent
-sys.path.append(str(project_root))
 
 from src.models.ollama_client import OllamaClient
 from src.config.config import OLLAMA_CONFIG
@@ -0,0 +1,56 @@
+"""
+Leitura e escrita dos dados consolidados pelo processador de dados.
+
+Fica separado do processador para que os geradores de insights e de matérias possam
+ler os dados sem importar as dependências de processamento de texto (NLTK).
+"""
+
+from typing import Any, Dict, Iterable, Optional
+import orjson
+
+from src.utils.json_io import WRITE_BUFFER_SIZE, DUMPS_OPTIONS, load_json, save_json
+
+# Dados consolidados: um manifesto pequeno (contagens, tendências, nomes dos tópicos) e os
+# grupos de itens de cada tópico, um por linha e na ordem do manifesto
+CONSOLIDATED_META_PATH = "data/processed/consolidated_data.meta.json"
+CONSOLIDATED_TOPICS_PATH = "data/processed/consolidated_data.topics.jsonl"
+
+def save_consolidated_data(consolidated_data: Dict[str, Any]) -> None:
+    """
+    Salva os dados consolidados como manifesto + grupos de tópicos em JSONL.
+    
+    Args:
+        consolidated_data: Dados consolidados (com os grupos em "topics")
+    """
+    topics = consolidated_data["topics"]
+    meta = {key: value for key, value in consolidated_data.items() if key != "topics"}
+    meta["topic_names"] = list(topics)
+    save_json(meta, CONSOLIDATED_META_PATH)
+    
+    with open(CONSOLIDATED_TOPICS_PATH, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        for topic, items in topics.items():
+            f.write(orjson.dumps({"topic": topic, "items": items}, option=DUMPS_OPTIONS))
+            f.write(b"\n")
+
+def load_consolidated_data(topics: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Carrega os dados consolidados.
+    
+    Args:
+        topics: Tópicos cujos itens devem ser carregados (None carrega todos); as linhas
+            dos demais tópicos são puladas sem serem decodificadas
+        
+    Returns:
+        Dados consolidados, com os grupos carregados em "topics"
+    """
+    data = load_json(CONSOLIDATED_META_PATH)
+    topic_names = data.pop("topic_names", [])
+    wanted = None if topics is None else set(topics)
+    
+    data["topics"] = {}
+    with open(CONSOLIDATED_TOPICS_PATH, 'rb') as f:
+        for topic, line in zip(topic_names, f):
+            if wanted is None or topic in wanted:
+                data["topics"][topic] = orjson.loads(line)["items"]
+    
+    return data
@@ -0,0 +1,23 @@
+"""
+Utilitários para extração do engajamento dos itens processados.
+"""
+
+from typing import List, Dict, Any
+import numpy as np
+
+def engagement_array(items: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Extrai o engajamento de cada item (normalizado, se disponível, ou total) em um array.
+    
+    Args:
+        items: Itens processados
+        
+    Returns:
+        Engajamento de cada item, na ordem dos itens (0 quando ausente)
+    """
+    values = np.zeros(len(items), dtype=np.float64)
+    for i, item in enumerate(items):
+        engagement = item.get("engagement")
+        if isinstance(engagement, dict):
+            values[i] = engagement.get("normalized_engagement", engagement.get("total_engagement", 0))
+    return values
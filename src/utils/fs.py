@@ -0,0 +1,20 @@
+"""
+Utilitários para manipulação do sistema de arquivos.
+"""
+
+import os
+
+# Diretórios já criados (ou verificados) neste processo
+_ENSURED_DIRS = set()
+
+def ensure_dir(path) -> None:
+    """
+    Garante que um diretório exista, consultando o sistema de arquivos apenas na primeira vez.
+    
+    Args:
+        path: Caminho do diretório
+    """
+    path = str(path)
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
@@ -0,0 +1,56 @@
+"""
+Sessão HTTP compartilhada entre os componentes do projeto.
+"""
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Tamanho do pool de conexões reaproveitadas por host
+POOL_MAXSIZE = 32
+
+_session = None
+_session_lock = threading.Lock()
+
+def _build_session() -> requests.Session:
+    """
+    Cria uma sessão HTTP com pool de conexões e novas tentativas automáticas.
+    
+    Returns:
+        Sessão HTTP configurada
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=Retry(total=3, backoff_factor=0.5)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    })
+    return session
+
+def get_session() -> requests.Session:
+    """
+    Obtém a sessão HTTP do processo, criando-a na primeira chamada.
+    
+    Returns:
+        Sessão HTTP compartilhada
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+def close_session() -> None:
+    """Fecha a sessão HTTP compartilhada, liberando as conexões abertas."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
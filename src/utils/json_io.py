@@ -0,0 +1,68 @@
+"""
+Utilitários para leitura e escrita de arquivos JSON.
+"""
+
+from typing import Any, Iterable, Iterator
+import orjson
+
+# Buffer de escrita de 1 MiB para reduzir o número de chamadas de sistema
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Tamanho de cada leitura na leitura incremental (ijson) de arquivos JSON grandes
+STREAM_READ_SIZE = 1 << 17
+
+# Opções de serialização: chaves não textuais, arrays/escalares do NumPy e datetimes
+# (formatados em ISO 8601 pelo próprio orjson) são serializados diretamente
+DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def load_json(file_path: str) -> Any:
+    """
+    Carrega dados de um arquivo JSON.
+    
+    Args:
+        file_path: Caminho do arquivo
+        
+    Returns:
+        Dados carregados
+    """
+    with open(file_path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def save_json(data: Any, file_path: str) -> None:
+    """
+    Salva dados em um arquivo JSON indentado.
+    
+    Args:
+        data: Dados a serem salvos
+        file_path: Caminho do arquivo
+    """
+    with open(file_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | DUMPS_OPTIONS))
+
+def save_jsonl(data: Iterable[Any], file_path: str) -> None:
+    """
+    Salva dados em um arquivo JSONL (um objeto JSON por linha).
+    
+    Args:
+        data: Itens a serem salvos
+        file_path: Caminho do arquivo
+    """
+    with open(file_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        for item in data:
+            f.write(orjson.dumps(item, option=DUMPS_OPTIONS))
+            f.write(b"\n")
+
+def iter_jsonl(file_path: str) -> Iterator[Any]:
+    """
+    Lê um arquivo JSONL item a item, sem carregar o arquivo inteiro na memória.
+    
+    Args:
+        file_path: Caminho do arquivo
+        
+    Returns:
+        Iterador sobre os itens do arquivo
+    """
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
@@ -0,0 +1,34 @@
+"""
+Utilitários para ordenação de itens por pontuação.
+"""
+
+from typing import List, Optional
+import numpy as np
+
+def rank_indices(scores: np.ndarray, top_k: Optional[int] = None) -> List[int]:
+    """
+    Retorna os índices dos itens em ordem decrescente de pontuação (estável em empates).
+    
+    Quando apenas os K maiores são necessários, seleciona-os com np.partition (O(n))
+    e ordena só esses K, em vez de ordenar todos os itens.
+    
+    Args:
+        scores: Pontuação de cada item
+        top_k: Número de itens a retornar (None retorna todos)
+        
+    Returns:
+        Índices dos itens selecionados, do maior para o menor
+    """
+    if top_k is None or top_k >= len(scores):
+        return np.argsort(-scores, kind="stable").tolist()
+    
+    if top_k <= 0:
+        return []
+    
+    # K-ésima maior pontuação; empates nesse limite são desfeitos pela ordem original
+    threshold = -np.partition(-scores, top_k - 1)[top_k - 1]
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+    candidates = np.concatenate((above, ties))
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order].tolist()
@@ -0,0 +1,37 @@
+"""
+Limitador de taxa para requisições feitas a partir de várias threads.
+"""
+
+import threading
+import time
+
+class RateLimiter:
+    """Limitador de taxa baseado em token bucket, seguro para uso entre threads."""
+    
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Inicializa o limitador de taxa.
+        
+        Args:
+            rate: Número de tokens repostos por segundo
+            capacity: Número máximo de tokens acumulados (tamanho da rajada)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Consome um token, aguardando apenas o tempo necessário até que ele esteja disponível."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            
+            # O token é reservado imediatamente; saldo negativo indica quanto falta para repô-lo
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        
+        if wait > 0:
+            time.sleep(wait)
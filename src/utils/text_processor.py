@@ -3,17 +3,78 @@ Utilitários para processamento de texto e análise de relevância.
 """
 
 import re
+import os
+import math
+import multiprocessing
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from itertools import chain, repeat
+import numpy as np
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import PunktTokenizer
 from nltk.stem import RSLPStemmer
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+from src.config.config import PROCESSING_CONFIG
+from src.utils.ranking import rank_indices
+
 logger = logging.getLogger(__name__)
 
+# Expressões regulares de limpeza, compiladas uma única vez
+_URL_RE = re.compile(r'https?://\S+|www\.\S+')
+_HTML_TAG_RE = re.compile(r'<.*?>')
+# Caracteres especiais e números, removidos em uma única passada (as duas classes são disjuntas)
+_PUNCT_DIGITS_RE = re.compile(r'[^\w\s]+|\d+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Palavras de um texto (os textos tokenizados já passaram por clean_text, que remove a pontuação)
+_WORD_RE = re.compile(r'\w+')
+
+# Recursos do NLTK usados pelo processador de texto
+_NLTK_RESOURCES = ("punkt", "punkt_tab", "stopwords", "rslp")
+
+# Indica se os recursos do NLTK já foram verificados neste processo
+_nltk_resources_ready = False
+
+# Número máximo de palavras com radical memorizado por processador
+_STEM_CACHE_SIZE = 100_000
+
+def _ensure_nltk_resources() -> None:
+    """Baixa os recursos do NLTK necessários, verificando-os apenas uma vez por processo."""
+    global _nltk_resources_ready
+    if _nltk_resources_ready:
+        return
+    
+    for resource in _NLTK_RESOURCES:
+        nltk.download(resource, quiet=True)
+    _nltk_resources_ready = True
+
+# Idiomas dos modelos Punkt do NLTK, pelo prefixo do código de idioma da configuração
+_PUNKT_LANGUAGES = {
+    "pt": "portuguese",
+    "en": "english",
+    "es": "spanish",
+}
+
+def load_sentence_tokenizer(language: str) -> Optional[PunktTokenizer]:
+    """
+    Carrega o segmentador de sentenças do NLTK para um idioma, para ser reaproveitado entre chamadas.
+    
+    Args:
+        language: Código do idioma (ex.: pt-br)
+        
+    Returns:
+        Segmentador de sentenças, ou None se o modelo não estiver disponível
+    """
+    try:
+        return PunktTokenizer(_PUNKT_LANGUAGES.get(language.split("-")[0].lower(), "english"))
+    except Exception as e:
+        logger.error(f"Erro ao carregar o segmentador de sentenças ({language}): {e}")
+        return None
+
 class TextProcessor:
     """Classe para processamento e análise de texto."""
     
@@ -21,15 +82,19 @@ class TextProcessor:
         """Inicializa o processador de texto."""
         # Baixar recursos do NLTK necessários
         try:
-            nltk.download('punkt', quiet=True)
-            nltk.download('stopwords', quiet=True)
-            nltk.download('rslp', quiet=True)
-            self.stop_words = set(stopwords.words('portuguese'))
+            _ensure_nltk_resources()
+            self.stop_words = frozenset(stopwords.words('portuguese'))
             self.stemmer = RSLPStemmer()
         except Exception as e:
             logger.error(f"Erro ao inicializar recursos NLTK: {e}")
-            self.stop_words = set()
+            self.stop_words = frozenset()
             self.stemmer = None
+        
+        # Radicais memorizados: o mesmo vocabulário se repete muito entre os textos
+        self._stem = lru_cache(maxsize=_STEM_CACHE_SIZE)(self.stemmer.stem) if self.stemmer else None
+        
+        # Palavras-chave já pré-processadas, indexadas pela lista original
+        self._keyword_cache = {}
     
     def clean_text(self, text: str) -> str:
         """
@@ -44,18 +109,19 @@ class TextProcessor:
         if not text:
             return ""
             
-        # Remover URLs
-        text = re.sub(r'https?://\S+|www\.\S+', '', text)
+        # Remover URLs (a maioria dos textos não tem nenhuma, e a verificação evita a passada)
+        if 'http' in text or 'www.' in text:
+            text = _URL_RE.sub('', text)
         
-        # Remover tags HTML
-        text = re.sub(r'<.*?>', '', text)
+        # Remover tags HTML; a ordem importa, pois uma URL dentro de uma tag pode levar o seu '>'
+        if '<' in text:
+            text = _HTML_TAG_RE.sub('', text)
         
         # Remover caracteres especiais e números
-        text = re.sub(r'[^\w\s]', '', text)
-        text = re.sub(r'\d+', '', text)
+        text = _PUNCT_DIGITS_RE.sub('', text)
         
         # Remover espaços extras
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         
         return text
     
@@ -72,7 +138,7 @@ class TextProcessor:
         if not text:
             return []
             
-        return word_tokenize(text.lower())
+        return _WORD_RE.findall(text.lower())
     
     def remove_stopwords(self, tokens: List[str]) -> List[str]:
         """
@@ -87,7 +153,8 @@ class TextProcessor:
         if not tokens:
             return []
             
-        return [token for token in tokens if token not in self.stop_words]
+        stop_words = self.stop_words
+        return [token for token in tokens if token not in stop_words]
     
     def stem_tokens(self, tokens: List[str]) -> List[str]:
         """
@@ -102,7 +169,8 @@ class TextProcessor:
         if not tokens or not self.stemmer:
             return tokens
             
-        return [self.stemmer.stem(token) for token in tokens]
+        stem = self._stem
+        return [stem(token) for token in tokens]
     
     def preprocess_text(self, text: str) -> List[str]:
         """
@@ -138,18 +206,22 @@ class TextProcessor:
         # Pré-processar o texto
         processed_text = self.preprocess_text(text)
         
-        # Pré-processar as palavras-chave
-        processed_keywords = []
-        for keyword in keywords:
-            processed_keywords.extend(self.preprocess_text(keyword))
-        
-        # Contar ocorrências de palavras-chave no texto
-        keyword_count = sum(1 for token in processed_text if token in processed_keywords)
+        # Pré-processar as palavras-chave uma única vez por lista (conjunto para busca em tempo constante)
+        cache_key = tuple(keywords)
+        processed_keywords = self._keyword_cache.get(cache_key)
+        if processed_keywords is None:
+            processed_keywords = frozenset(
+                token for keyword in keywords for token in self.preprocess_text(keyword)
+            )
+            self._keyword_cache[cache_key] = processed_keywords
         
-        # Calcular pontuação de relevância
         if not processed_text:
             return 0.0
-            
+        
+        # Contar ocorrências de palavras-chave no texto (map + sum percorrem os tokens em C)
+        keyword_count = sum(map(processed_keywords.__contains__, processed_text))
+        
+        # Calcular pontuação de relevância
         relevance_score = min(1.0, keyword_count / (len(processed_text) * 0.1))
         
         return relevance_score
@@ -196,31 +268,126 @@ class TextProcessor:
         if len(sentences) <= max_sentences:
             return text
             
-        # Calcular a frequência das palavras
-        words = self.tokenize(text)
-        words = self.remove_stopwords(words)
-        
-        word_freq = {}
-        for word in words:
-            if word not in word_freq:
-                word_freq[word] = 1
-            else:
-                word_freq[word] += 1
+        # Tokenizar cada sentença (limpa, como nos demais usos de tokenize) uma única vez; a frequência
+        # das palavras no texto é a soma das sentenças
+        sentence_words = [self.remove_stopwords(self.tokenize(self.clean_text(sentence))) for sentence in sentences]
+        word_freq = Counter(chain.from_iterable(sentence_words))
         
         # Calcular a pontuação de cada sentença
-        sentence_scores = {}
-        for i, sentence in enumerate(sentences):
-            sentence_words = self.tokenize(sentence)
-            sentence_words = self.remove_stopwords(sentence_words)
-            
-            score = sum(word_freq.get(word, 0) for word in sentence_words)
-            sentence_scores[i] = score
+        sentence_scores = np.fromiter(
+            (sum(map(word_freq.__getitem__, words)) for words in sentence_words),
+            dtype=np.int64,
+            count=len(sentences)
+        )
         
-        # Selecionar as sentenças com maior pontuação
-        top_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:max_sentences]
-        top_sentences = sorted(top_sentences, key=lambda x: x[0])  # Ordenar por posição original
+        # Selecionar as sentenças com maior pontuação (empates favorecem as primeiras), na ordem original
+        top_sentences = sorted(rank_indices(sentence_scores, max_sentences))
         
         # Construir o resumo
-        summary = ' '.join(sentences[i] for i, _ in top_sentences)
+        summary = ' '.join(sentences[i] for i in top_sentences)
         
         return summary
+
+def count_words(cleaned_text: str) -> int:
+    """
+    Conta as palavras de um texto já limpo, sem criar a lista de palavras.
+    
+    O texto limpo tem espaços simples entre as palavras e nenhum nas pontas,
+    então o número de palavras é o número de espaços mais um.
+    
+    Args:
+        cleaned_text: Texto retornado por TextProcessor.clean_text
+        
+    Returns:
+        Número de palavras
+    """
+    return cleaned_text.count(' ') + 1 if cleaned_text else 0
+
+# Processador de texto de cada processo auxiliar, criado uma única vez por processo
+_worker_processor = None
+
+def _init_worker(nltk_resources_ready: bool) -> None:
+    """
+    Inicializa o processador de texto de um processo auxiliar, uma única vez por processo.
+    
+    Args:
+        nltk_resources_ready: Se o processo principal já verificou os recursos do NLTK (o processo
+            auxiliar então apenas os carrega, sem repetir as consultas de nltk.download)
+    """
+    global _worker_processor, _nltk_resources_ready
+    _nltk_resources_ready = nltk_resources_ready
+    _worker_processor = TextProcessor()
+
+def _analyze_text(processor: TextProcessor, text: str, keywords: Tuple[str, ...]) -> Optional[Tuple[str, float, List[str], int]]:
+    """
+    Limpa um texto, calcula sua relevância e extrai suas entidades.
+    
+    Args:
+        processor: Processador de texto
+        text: Texto a ser analisado
+        keywords: Palavras-chave para o cálculo de relevância
+        
+    Returns:
+        Tupla (texto limpo, relevância, entidades, número de palavras), ou None se o
+        texto ficar vazio após a limpeza ou em caso de erro
+    """
+    try:
+        cleaned_text = processor.clean_text(text)
+        
+        # Textos sem conteúdo (apenas espaços, emojis, links...) não passam pelo processamento de linguagem
+        if not cleaned_text:
+            return None
+        
+        relevance_score = processor.calculate_relevance_score(cleaned_text, keywords)
+        entities = processor.extract_entities(cleaned_text)
+        return cleaned_text, relevance_score, entities, count_words(cleaned_text)
+    except Exception as e:
+        logger.error(f"Erro ao analisar texto: {e}")
+        return None
+
+def _analyze_chunk(texts: List[str], keywords: Tuple[str, ...]) -> List[Optional[Tuple[str, float, List[str], int]]]:
+    """
+    Analisa um bloco de textos em um processo auxiliar.
+    
+    Args:
+        texts: Textos a serem analisados
+        keywords: Palavras-chave para o cálculo de relevância
+        
+    Returns:
+        Resultados da análise, na ordem dos textos
+    """
+    return [_analyze_text(_worker_processor, text, keywords) for text in texts]
+
+def analyze_texts(texts: List[str], keywords: Tuple[str, ...], processor: TextProcessor) -> List[Optional[Tuple[str, float, List[str], int]]]:
+    """
+    Analisa vários textos independentes, distribuindo-os entre processos quando o volume justifica.
+    
+    Abaixo de PROCESSING_CONFIG["parallel_min_items"] textos, o custo de iniciar os processos
+    supera o ganho, e a análise é feita no processo atual com o processador informado.
+    
+    Args:
+        texts: Textos a serem analisados
+        keywords: Palavras-chave para o cálculo de relevância
+        processor: Processador de texto usado na análise sequencial
+        
+    Returns:
+        Lista de tuplas (texto limpo, relevância, entidades, número de palavras), ou None para
+        textos vazios ou cuja análise falhou
+    """
+    max_workers = PROCESSING_CONFIG.get("max_processes") or os.cpu_count() or 1
+    if len(texts) < PROCESSING_CONFIG.get("parallel_min_items", 200) or max_workers < 2:
+        return [_analyze_text(processor, text, keywords) for text in texts]
+    
+    # Dividir os textos em um bloco por processo, preservando a ordem
+    chunk_size = math.ceil(len(texts) / max_workers)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    
+    # Os agentes chamam esta função em threads, com outros pools ativos; "spawn" evita herdar
+    # por fork locks que estejam ocupados nessas threads (logging, sqlite, requests)
+    results = []
+    with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker, initargs=(_nltk_resources_ready,),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        for chunk_results in executor.map(_analyze_chunk, chunks, repeat(keywords)):
+            results.extend(chunk_results)
+    
+    return results
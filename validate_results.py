@@ -3,38 +3,80 @@ Script para validar os resultados do sistema de agentes de IA.
 """
 
 import logging
-import json
+from logging.handlers import MemoryHandler
 import os
-from pathlib import Path
-import sys
+import ijson
 import argparse
+from functools import cached_property, lru_cache
+from typing import Optional, Tuple
 
-# Adicionar o diretório raiz ao path
-project_root = Path(__file__).parent
-sys.path.append(str(project_root))
+from src.utils.json_io import STREAM_READ_SIZE, load_json
 
-from src.models.ollama_client import OllamaClient
-from src.config.config import OLLAMA_CONFIG
-
-# Configurar logging
+# Configurar logging: o arquivo recebe os registros em blocos de até 512 (ou imediatamente a partir
+# de ERROR), em vez de uma escrita por registro
+_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_log_file_handler = logging.FileHandler("validation.log")
+_log_file_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format=_LOG_FORMAT,
     handlers=[
-        logging.FileHandler("validation.log"),
+        MemoryHandler(capacity=512, target=_log_file_handler),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Campos obrigatórios, na ordem usada nas mensagens, e como conjunto para a verificação rápida
+_REQUIRED_ARTICLE_FIELDS = ("materia", "editoria", "subtitulo", "titulo", "keywords")
+_REQUIRED_ARTICLE_FIELD_SET = frozenset(_REQUIRED_ARTICLE_FIELDS)
+_REQUIRED_INSIGHT_FIELDS = ("source_distribution", "topic_insights", "engagement_metrics", "content_recommendations")
+_REQUIRED_INSIGHT_FIELD_SET = frozenset(_REQUIRED_INSIGHT_FIELDS)
+
+@lru_cache(maxsize=4096)
+def _check_article_text(materia: str) -> Tuple[Optional[str], int, int]:
+    """
+    Verifica o número de palavras, o número de parágrafos e a ausência de aspas no texto de uma matéria.
+    
+    O resultado depende apenas do texto, então é memorizado: validações repetidas da mesma matéria
+    (ex.: a passada de contagem seguida da detalhada) não percorrem o texto de novo.
+    
+    Args:
+        materia: Texto da matéria (não vazio)
+        
+    Returns:
+        Tupla (mensagem de erro ou None, número de palavras, número de parágrafos)
+    """
+    # Verificar número de palavras
+    word_count = len(materia.split())
+    if word_count < 500:
+        return f"Matéria tem apenas {word_count} palavras (mínimo: 500)", word_count, 0
+    
+    # Verificar número de parágrafos (contados pelos separadores, sem criar a lista de parágrafos)
+    paragraph_count = materia.count("\n\n") + 1
+    if paragraph_count > 5:
+        return f"Matéria tem {paragraph_count} parágrafos (máximo: 5)", word_count, paragraph_count
+    
+    # Verificar presença de aspas
+    if '"' in materia or "'" in materia:
+        return "Matéria contém aspas", word_count, paragraph_count
+    
+    return None, word_count, paragraph_count
+
 class ResultValidator:
     """Validador de resultados do sistema de agentes de IA."""
     
     def __init__(self):
         """Inicializa o validador de resultados."""
-        self.ollama_client = OllamaClient(OLLAMA_CONFIG)
         logger.info("Validador de resultados inicializado")
     
+    @cached_property
+    def ollama_client(self):
+        """Cliente Ollama, criado apenas no primeiro uso (nenhuma validação atual depende dele)."""
+        from src.models.ollama_client import OllamaClient
+        from src.config.config import OLLAMA_CONFIG
+        return OllamaClient(OLLAMA_CONFIG)
+    
     def validate_article_format(self, article: dict) -> dict:
         """
         Valida o formato de uma matéria.
@@ -43,114 +85,112 @@ class ResultValidator:
             article: Matéria a ser validada
             
         Returns:
-            Resultado da validação
+            Resultado da validação, identificando a matéria pelo título (sem copiar o seu conteúdo)
         """
-        required_fields = ["materia", "editoria", "subtitulo", "titulo", "keywords"]
-        missing_fields = [field for field in required_fields if field not in article]
-        
-        # Verificar campos obrigatórios
-        if missing_fields:
+        # Verificar campos obrigatórios (os ausentes só são listados se algum faltar)
+        if not article.keys() >= _REQUIRED_ARTICLE_FIELD_SET:
+            missing_fields = [field for field in _REQUIRED_ARTICLE_FIELDS if field not in article]
             return {
                 "valid": False,
                 "message": f"Campos obrigatórios ausentes: {', '.join(missing_fields)}",
-                "article": article
+                "titulo": article.get("titulo")
             }
         
+        # Campos lidos uma única vez (a presença já foi verificada)
+        materia = article["materia"]
+        keywords = article["keywords"]
+        
         # Verificar conteúdo da matéria
-        if not article.get("materia", ""):
+        if not materia:
             return {
                 "valid": False,
                 "message": "Conteúdo da matéria está vazio",
-                "article": article
-            }
-        
-        # Verificar número de palavras
-        word_count = len(article.get("materia", "").split())
-        if word_count < 500:
-            return {
-                "valid": False,
-                "message": f"Matéria tem apenas {word_count} palavras (mínimo: 500)",
-                "article": article
-            }
-        
-        # Verificar número de parágrafos
-        paragraphs = article.get("materia", "").split("\n\n")
-        if len(paragraphs) > 5:
-            return {
-                "valid": False,
-                "message": f"Matéria tem {len(paragraphs)} parágrafos (máximo: 5)",
-                "article": article
+                "titulo": article.get("titulo")
             }
         
-        # Verificar presença de aspas
-        if '"' in article.get("materia", "") or "'" in article.get("materia", ""):
+        # Verificar palavras, parágrafos e aspas (resultado memorizado pelo texto da matéria)
+        error, word_count, paragraph_count = _check_article_text(materia)
+        if error:
             return {
                 "valid": False,
-                "message": "Matéria contém aspas",
-                "article": article
+                "message": error,
+                "titulo": article.get("titulo")
             }
         
         # Verificar keywords
-        if not isinstance(article.get("keywords", []), list) or len(article.get("keywords", [])) == 0:
+        if not isinstance(keywords, list) or len(keywords) == 0:
             return {
                 "valid": False,
                 "message": "Keywords ausentes ou em formato inválido",
-                "article": article
+                "titulo": article.get("titulo")
             }
         
         return {
             "valid": True,
             "message": "Matéria válida",
-            "article": article,
+            "titulo": article.get("titulo"),
             "word_count": word_count,
-            "paragraph_count": len(paragraphs)
+            "paragraph_count": paragraph_count
         }
     
-    def validate_articles_file(self, file_path: str) -> dict:
+    def validate_articles_file(self, file_path: str, fast: bool = False) -> dict:
         """
         Valida um arquivo de matérias.
         
         Args:
             file_path: Caminho do arquivo
+            fast: Se True, apenas conta as matérias válidas e inválidas, sem guardar o resultado
+                de cada uma (memória constante; "validation_results" não é incluído)
             
         Returns:
             Resultado da validação
         """
         try:
-            # Verificar se o arquivo existe
-            if not os.path.exists(file_path):
-                return {
-                    "valid": False,
-                    "message": f"Arquivo não encontrado: {file_path}",
-                    "articles": []
-                }
+            validation_results = []
+            total_count = 0
+            valid_count = 0
             
-            # Carregar arquivo
-            with open(file_path, 'r', encoding='utf-8') as f:
-                articles = json.load(f)
-            
-            # Verificar se é uma lista
-            if not isinstance(articles, list):
-                return {
-                    "valid": False,
-                    "message": "Formato inválido: o arquivo deve conter uma lista de matérias",
-                    "articles": []
-                }
-            
-            # Validar cada matéria
-            validation_results = [self.validate_article_format(article) for article in articles]
+            # Percorrer as matérias uma a uma, validando cada uma enquanto o arquivo é lido
+            with open(file_path, 'rb') as f:
+                events = ijson.parse(f, buf_size=STREAM_READ_SIZE, use_float=True)
+                
+                # Verificar se é uma lista
+                if next(events, None) != ("", "start_array", None):
+                    return {
+                        "valid": False,
+                        "message": "Formato inválido: o arquivo deve conter uma lista de matérias",
+                        "articles": []
+                    }
+                
+                # Validar cada matéria
+                for article in ijson.items(events, "item"):
+                    validation = self.validate_article_format(article)
+                    validation["index"] = total_count
+                    total_count += 1
+                    valid_count += validation["valid"]
+                    if not fast:
+                        validation_results.append(validation)
             
-            # Contar matérias válidas e inválidas
-            valid_count = sum(1 for result in validation_results if result["valid"])
-            invalid_count = len(validation_results) - valid_count
+            # Contar matérias inválidas
+            invalid_count = total_count - valid_count
             
-            return {
+            result = {
                 "valid": valid_count > 0,
                 "message": f"{valid_count} matérias válidas, {invalid_count} inválidas",
-                "total_articles": len(articles),
+                "total_articles": total_count,
                 "valid_articles": valid_count,
-                "invalid_articles": invalid_count,
-                "validation_results": validation_results
+                "invalid_articles": invalid_count
+            }
+            if not fast:
+                result["validation_results"] = validation_results
+            return result
+        
+        except FileNotFoundError:
+            # Arquivo inexistente: detectado pela própria abertura, sem verificar a existência antes
+            return {
+                "valid": False,
+                "message": f"Arquivo não encontrado: {file_path}",
+                "articles": []
             }
         
         except Exception as e:
@@ -172,17 +212,8 @@ class ResultValidator:
             Resultado da validação
         """
         try:
-            # Verificar se o arquivo existe
-            if not os.path.exists(file_path):
-                return {
-                    "valid": False,
-                    "message": f"Arquivo não encontrado: {file_path}",
-                    "insights": {}
-                }
-            
             # Carregar arquivo
-            with open(file_path, 'r', encoding='utf-8') as f:
-                insights = json.load(f)
+            insights = load_json(file_path)
             
             # Verificar se é um dicionário
             if not isinstance(insights, dict):
@@ -193,10 +224,8 @@ class ResultValidator:
                 }
             
             # Verificar campos obrigatórios
-            required_fields = ["source_distribution", "topic_insights", "engagement_metrics", "content_recommendations"]
-            missing_fields = [field for field in required_fields if field not in insights]
-            
-            if missing_fields:
+            if not insights.keys() >= _REQUIRED_INSIGHT_FIELD_SET:
+                missing_fields = [field for field in _REQUIRED_INSIGHT_FIELDS if field not in insights]
                 return {
                     "valid": False,
                     "message": f"Campos obrigatórios ausentes: {', '.join(missing_fields)}",
@@ -211,6 +240,14 @@ class ResultValidator:
                 "recommendation_count": len(insights.get("content_recommendations", []))
             }
         
+        except FileNotFoundError:
+            # Arquivo inexistente: detectado pela própria abertura, sem verificar a existência antes
+            return {
+                "valid": False,
+                "message": f"Arquivo não encontrado: {file_path}",
+                "insights": {}
+            }
+        
         except Exception as e:
             logger.error(f"Erro ao validar arquivo de insights: {e}")
             return {
@@ -226,15 +263,22 @@ class ResultValidator:
         Returns:
             Resultado da validação
         """
-        # Validar arquivo de matérias
-        articles_result = self.validate_articles_file("data/processed/materias.json")
+        # Validar arquivo de matérias: primeiro apenas as contagens; o detalhamento de cada
+        # matéria só é coletado se o arquivo for inválido
+        articles_result = self.validate_articles_file("data/processed/materias.json", fast=True)
+        if not articles_result["valid"] and articles_result.get("total_articles"):
+            articles_result = self.validate_articles_file("data/processed/materias.json")
         
         # Validar arquivo de insights
         insights_result = self.validate_insights_file("data/processed/insights.json")
         
-        # Verificar existência de visualizações
-        visualization_files = list(Path("data/processed/visualizations").glob("*.png"))
-        visualizations_valid = len(visualization_files) > 0
+        # Verificar existência de visualizações (as entradas do diretório já informam o tipo, sem stat por arquivo)
+        try:
+            with os.scandir("data/processed/visualizations") as entries:
+                visualization_count = sum(1 for entry in entries if entry.name.endswith(".png") and entry.is_file())
+        except FileNotFoundError:
+            visualization_count = 0
+        visualizations_valid = visualization_count > 0
         
         # Consolidar resultados
         all_valid = articles_result["valid"] and insights_result["valid"] and visualizations_valid
@@ -245,7 +289,7 @@ class ResultValidator:
             "articles_validation": articles_result,
             "insights_validation": insights_result,
             "visualizations_valid": visualizations_valid,
-            "visualization_count": len(visualization_files)
+            "visualization_count": visualization_count
         }
 
 def main():
@@ -268,8 +312,7 @@ def main():
             logger.info("Detalhes das matérias válidas:")
             for i, validation in enumerate(result["validation_results"]):
                 if validation["valid"]:
-                    article = validation["article"]
-                    logger.info(f"{i+1}. {article.get('titulo', 'Sem título')} - {validation.get('word_count', 0)} palavras, {validation.get('paragraph_count', 0)} parágrafos")
+                    logger.info(f"{i+1}. {validation['titulo'] or 'Sem título'} - {validation.get('word_count', 0)} palavras, {validation.get('paragraph_count', 0)} parágrafos")
     
     elif args.insights:
         result = validator.validate_insights_file("data/processed/insights.json")